@@ -0,0 +1,90 @@
+import logging
+import threading
+
+import boto3
+from botocore.config import Config
+
+log = logging.getLogger()
+
+# Clients are thread-safe and are shared by every thread. Resources are not,
+# so each thread keeps its own copy. Both are keyed by
+# (service, region_name, profile_name).
+_lock = threading.Lock()
+_local = threading.local()
+_sessions = {}
+_clients = {}
+_generation = 0
+_config = {
+    "max_pool_connections": 50,
+    "tcp_keepalive": True,
+}
+
+
+# Tune the connection pool used by clients and resources created afterwards
+def configure(max_pool_connections=None, tcp_keepalive=None, **config):
+    global _generation
+    with _lock:
+        if max_pool_connections is not None:
+            _config["max_pool_connections"] = max_pool_connections
+        if tcp_keepalive is not None:
+            _config["tcp_keepalive"] = tcp_keepalive
+        _config.update(config)
+        _clients.clear()
+        _generation += 1
+    log.info(f"Client pool configured: {_config}")
+
+
+# Drop every cached session, client and resource
+def clear():
+    global _generation
+    with _lock:
+        _sessions.clear()
+        _clients.clear()
+        _generation += 1
+
+
+def _get_session(profile_name=None):
+    # Caller must hold _lock
+    session = _sessions.get(profile_name)
+    if session is None:
+        session = boto3.session.Session(profile_name=profile_name)
+        _sessions[profile_name] = session
+    return session
+
+
+# Get a shared session for the given profile
+def get_session(profile_name=None):
+    with _lock:
+        return _get_session(profile_name)
+
+
+# Get a cached client for (service, region, profile)
+def get_client(service, region_name=None, profile_name=None):
+    key = (service, region_name, profile_name)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _get_session(profile_name).client(
+                service, region_name=region_name, config=Config(**_config)
+            )
+            _clients[key] = client
+    return client
+
+
+# Get a per-thread cached resource for (service, region, profile)
+def get_resource(service, region_name=None, profile_name=None):
+    if getattr(_local, "generation", None) != _generation:
+        _local.resources = {}
+        _local.generation = _generation
+    key = (service, region_name, profile_name)
+    resource = _local.resources.get(key)
+    if resource is None:
+        with _lock:
+            resource = _get_session(profile_name).resource(
+                service, region_name=region_name, config=Config(**_config)
+            )
+        _local.resources[key] = resource
+    return resource
@@ -1,6 +1,19 @@
+import heapq
+import json
 import logging
+import os
+import queue
+import re
+import sqlite3
 import sys
-import boto3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+from client_manager import get_client
 
 # Configure logging
 logging.basicConfig(
@@ -9,10 +22,12 @@ logging.basicConfig(
 )
 log = logging.getLogger()
 
+TIME_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
 
 # List Log Groups and Log Streams
-def list_log_groups(group_name=None, region_name=None):
-    cwlogs = boto3.client("logs", region_name=region_name)
+def list_log_groups(group_name=None, region_name=None, client=None):
+    cwlogs = client or get_client("logs", region_name=region_name)
     params = (
         {
             "logGroupNamePrefix": group_name,
@@ -25,8 +40,10 @@ def list_log_groups(group_name=None, region_name=None):
 
 
 # List Log Group Streams
-def list_log_group_streams(group_name, stream_name=None, region_name=None):
-    cwlogs = boto3.client("logs", region_name=region_name)
+def list_log_group_streams(
+    group_name, stream_name=None, region_name=None, client=None
+):
+    cwlogs = client or get_client("logs", region_name=region_name)
     params = (
         {
             "logGroupName": group_name,
@@ -40,19 +57,397 @@ def list_log_group_streams(group_name, stream_name=None, region_name=None):
     return res["logStreams"]
 
 
+# Parse a time into epoch milliseconds. Accepts epoch milliseconds,
+# ISO 8601 ("2024-05-01T12:00", UTC unless an offset is given), "now"
+# and relative times ago such as "90s", "15m", "2h" or "7d".
+def parse_time(value):
+    if value is None or isinstance(value, int):
+        return value
+    value = str(value).strip()
+    if value.isdigit():
+        return int(value)
+    if value == "now":
+        return int(time.time() * 1000)
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([smhdw])", value)
+    if match:
+        seconds = float(match.group(1)) * TIME_UNITS[match.group(2)]
+        return int((time.time() - seconds) * 1000)
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+# Fetch every page of filtered events in [start, stop], following nextToken
+def _iter_event_pages(cwlogs, params):
+    params = dict(params)
+    while True:
+        res = cwlogs.filter_log_events(**params)
+        yield res["events"]
+        if not res.get("nextToken"):
+            return
+        params["nextToken"] = res["nextToken"]
+
+
+# Stream events out of a queue fed by a shard reader thread
+def _drain_shard(pages):
+    while True:
+        page = pages.get()
+        if page is None:
+            return
+        if isinstance(page, Exception):
+            raise page
+        yield from page
+
+
 # Filter Log Events
-def filter_log_events(group_name, filter_pat, start=None, stop=None, region_name=None):
-    cwlogs = boto3.client("logs", region_name=region_name)
+# Returns a generator over every matching event. With shards > 1 the
+# [start, stop) range is split into that many time shards fetched
+# concurrently, and merged back in timestamp order.
+def filter_log_events(
+    group_name,
+    filter_pat,
+    start=None,
+    stop=None,
+    region_name=None,
+    client=None,
+    shards=1,
+    prefetch=20,
+):
+    cwlogs = client or get_client("logs", region_name=region_name)
     params = {
         "logGroupName": group_name,
         "filterPattern": filter_pat,
     }
+    start, stop = parse_time(start), parse_time(stop)
     if start:
         params["startTime"] = start
     if stop:
         params["endTime"] = stop
-    res = cwlogs.filter_log_events(**params)
-    return res["events"]
+    if shards <= 1 or not start or start == stop:
+        for page in _iter_event_pages(cwlogs, params):
+            yield from page
+        return
+
+    stop = stop or int(time.time() * 1000)
+    if stop <= start:
+        return
+    step = max(1, -(-(stop - start) // shards))
+    bounds = [(s, min(s + step, stop)) for s in range(start, stop, step)]
+    queues = [queue.Queue(maxsize=prefetch) for _ in bounds]
+    closed = threading.Event()
+
+    def reader(shard_start, shard_stop, pages):
+        # endTime is inclusive: stop each shard 1 ms before the next one
+        shard = dict(params, startTime=shard_start, endTime=shard_stop - 1)
+        if shard_stop == stop:
+            shard["endTime"] = stop
+        try:
+            for page in _iter_event_pages(cwlogs, shard):
+                if closed.is_set():
+                    return
+                pages.put(page)
+        except Exception as err:
+            pages.put(err)
+        finally:
+            pages.put(None)
+
+    with ThreadPoolExecutor(max_workers=len(bounds)) as pool:
+        futures = [
+            pool.submit(reader, s, e, pages)
+            for (s, e), pages in zip(bounds, queues)
+        ]
+        try:
+            yield from heapq.merge(
+                *map(_drain_shard, queues),
+                key=lambda event: (event["timestamp"], event["eventId"]),
+            )
+        finally:
+            closed.set()
+            while not all(future.done() for future in futures):
+                for pages in queues:
+                    try:
+                        pages.get_nowait()
+                    except queue.Empty:
+                        pass
+                time.sleep(0.01)
+
+
+# Local event store: fetched events plus the [start, stop) windows they
+# cover, per log group and server-side filter pattern. Windows are never
+# cached closer to now than INGESTION_DELAY, as late events still arrive.
+INGESTION_DELAY = 5 * 60 * 1000
+EVENT_STORE_BYTES = 512 * 1024**2
+
+
+def _open_event_store(db_path):
+    db = sqlite3.connect(db_path)
+    db.executescript(
+        "CREATE TABLE IF NOT EXISTS events ("
+        " group_name TEXT, filter_pat TEXT, event_id TEXT, timestamp INTEGER,"
+        " stream TEXT, message TEXT,"
+        " PRIMARY KEY (group_name, filter_pat, event_id));"
+        "CREATE INDEX IF NOT EXISTS events_time"
+        " ON events (group_name, filter_pat, timestamp);"
+        "CREATE TABLE IF NOT EXISTS windows ("
+        " group_name TEXT, filter_pat TEXT, start INTEGER, stop INTEGER,"
+        " last_used REAL);"
+    )
+    db.create_function(
+        "regexp", 2, lambda pattern, value: bool(re.search(pattern, value))
+    )
+    return db
+
+
+# The parts of [start, stop) not covered by cached windows
+def _missing_ranges(db, group_name, filter_pat, start, stop):
+    windows = db.execute(
+        "SELECT start, stop FROM windows WHERE group_name = ?"
+        " AND filter_pat = ? AND stop > ? AND start < ? ORDER BY start",
+        (group_name, filter_pat, start, stop),
+    )
+    missing = []
+    cursor = start
+    for w_start, w_stop in windows:
+        if w_start > cursor:
+            missing.append((cursor, w_start))
+        cursor = max(cursor, w_stop)
+    if cursor < stop:
+        missing.append((cursor, stop))
+    return missing
+
+
+# Record a fetched window, merging it with the windows it touches
+def _add_window(db, group_name, filter_pat, start, stop):
+    key = (group_name, filter_pat)
+    touching = db.execute(
+        "SELECT rowid, start, stop FROM windows WHERE group_name = ?"
+        " AND filter_pat = ? AND stop >= ? AND start <= ?",
+        (*key, start, stop),
+    ).fetchall()
+    for rowid, w_start, w_stop in touching:
+        start, stop = min(start, w_start), max(stop, w_stop)
+        db.execute("DELETE FROM windows WHERE rowid = ?", (rowid,))
+    db.execute(
+        "INSERT INTO windows VALUES (?, ?, ?, ?, ?)",
+        (*key, start, stop, time.time()),
+    )
+
+
+# Evict least recently used windows (and their events) past max_bytes
+def _evict_events(db, max_bytes):
+    def used():
+        page_size = db.execute("PRAGMA page_size").fetchone()[0]
+        pages = db.execute("PRAGMA page_count").fetchone()[0]
+        free = db.execute("PRAGMA freelist_count").fetchone()[0]
+        return (pages - free) * page_size
+
+    while used() > max_bytes:
+        oldest = db.execute(
+            "SELECT rowid, group_name, filter_pat, start, stop FROM windows"
+            " ORDER BY last_used LIMIT 1"
+        ).fetchone()
+        if not oldest:
+            break
+        rowid, group_name, filter_pat, start, stop = oldest
+        db.execute(
+            "DELETE FROM events WHERE group_name = ? AND filter_pat = ?"
+            " AND timestamp >= ? AND timestamp < ?",
+            (group_name, filter_pat, start, stop),
+        )
+        db.execute("DELETE FROM windows WHERE rowid = ?", (rowid,))
+        db.commit()
+        log.info(f"Evicted cached events of {group_name} [{start}, {stop})")
+
+
+# Search Log Events through the local event store
+# Only the parts of [start, stop) not fetched before go to CloudWatch;
+# the rest is answered locally. regex is applied locally, so many
+# variants can be tried over the same window without any API calls.
+def search_log_events(
+    group_name,
+    start,
+    stop=None,
+    regex=None,
+    filter_pat="",
+    cache="cwlogs_cache.db",
+    max_bytes=EVENT_STORE_BYTES,
+    shards=1,
+    region_name=None,
+    client=None,
+):
+    start = parse_time(start)
+    stop = parse_time(stop) or int(time.time() * 1000)
+    db = _open_event_store(cache)
+    try:
+        with db:
+            for m_start, m_stop in _missing_ranges(
+                db, group_name, filter_pat, start, stop
+            ):
+                events = filter_log_events(
+                    group_name,
+                    filter_pat,
+                    m_start,
+                    m_stop - 1,
+                    region_name=region_name,
+                    client=client,
+                    shards=shards,
+                )
+                db.executemany(
+                    "INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        (
+                            group_name,
+                            filter_pat,
+                            e["eventId"],
+                            e["timestamp"],
+                            e["logStreamName"],
+                            e["message"],
+                        )
+                        for e in events
+                    ),
+                )
+                settled = min(m_stop, int(time.time() * 1000) - INGESTION_DELAY)
+                if settled > m_start:
+                    _add_window(db, group_name, filter_pat, m_start, settled)
+                log.info(f"Fetched {group_name} [{m_start}, {m_stop})")
+            db.execute(
+                "UPDATE windows SET last_used = ? WHERE group_name = ?"
+                " AND filter_pat = ? AND stop > ? AND start < ?",
+                (time.time(), group_name, filter_pat, start, stop),
+            )
+        _evict_events(db, max_bytes)
+
+        sql = (
+            "SELECT timestamp, event_id, stream, message FROM events"
+            " WHERE group_name = ? AND filter_pat = ?"
+            " AND timestamp >= ? AND timestamp < ?"
+        )
+        params = [group_name, filter_pat, start, stop]
+        if regex:
+            sql += " AND message REGEXP ?"
+            params.append(regex)
+        for timestamp, event_id, stream, message in db.execute(
+            sql + " ORDER BY timestamp, event_id", params
+        ):
+            yield {
+                "timestamp": timestamp,
+                "eventId": event_id,
+                "logStreamName": stream,
+                "message": message,
+            }
+    finally:
+        db.close()
+
+
+def _load_tail_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_tail_checkpoint(path, checkpoint):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+# Fetch the events of a group not seen yet. Its checkpoint holds the
+# first timestamp to tail from, the last timestamp seen and the events
+# seen (ID -> timestamp) within the lag window before it. Every poll
+# starts lag ms back (0: from the last timestamp), so events ingested
+# late with an earlier timestamp are still picked up, and the seen IDs
+# keep them from repeating.
+def _poll_group(cwlogs, group_name, filter_pat, position, lag):
+    seen = position["seen"]
+    start = max(position["since"], position["timestamp"] - lag)
+    events = [
+        event
+        for event in filter_log_events(
+            group_name, filter_pat, start=start, client=cwlogs
+        )
+        if event["eventId"] not in seen
+    ]
+    events.sort(key=lambda event: (event["timestamp"], event["eventId"]))
+    if events:
+        seen.update((e["eventId"], e["timestamp"]) for e in events)
+        last = max(position["timestamp"], events[-1]["timestamp"])
+        position.update(
+            timestamp=last,
+            seen={i: t for i, t in seen.items() if t >= last - lag},
+        )
+    return events
+
+
+# Tail Log Groups
+# Polls every group from its checkpoint (saved to the checkpoint file
+# after each poll that found events), so no event is reported twice, even
+# across restarts. lag > 0 makes each poll look that many seconds back
+# for events ingested late, at the cost of fetching that window again on
+# every poll; it is off by default. A quiet group is polled less and
+# less often, from min_interval up to max_interval seconds; activity
+# resets its interval.
+def tail_log_events(
+    groups,
+    filter_pat="",
+    checkpoint=None,
+    start=None,
+    min_interval=1,
+    max_interval=30,
+    lag=0,
+    on_event=None,
+    max_polls=None,
+    region_name=None,
+    client=None,
+):
+    cwlogs = client or get_client("logs", region_name=region_name)
+    if isinstance(groups, str):
+        groups = [groups]
+    on_event = on_event or (
+        lambda group, event: print(
+            group, event["timestamp"], event["logStreamName"], event["message"]
+        )
+    )
+    state = _load_tail_checkpoint(checkpoint) if checkpoint else {}
+    start = int(time.time() * 1000) if start is None else parse_time(start)
+    for group_name in groups:
+        position = state.setdefault(group_name, {"timestamp": start})
+        position.setdefault("since", position["timestamp"])
+        position.setdefault(
+            "seen",
+            {i: position["timestamp"] for i in position.pop("event_ids", [])},
+        )
+
+    # (next poll time, group, current interval) for every group
+    schedule = [(time.monotonic(), group, min_interval) for group in groups]
+    heapq.heapify(schedule)
+    polls = 0
+    while schedule and (max_polls is None or polls < max_polls):
+        due, group_name, interval = heapq.heappop(schedule)
+        time.sleep(max(0, due - time.monotonic()))
+        try:
+            events = _poll_group(
+                cwlogs, group_name, filter_pat, state[group_name], lag * 1000
+            )
+        except ClientError as err:
+            log.warning(f"{group_name}: {err}")
+            events = []
+        polls += 1
+        for event in events:
+            on_event(group_name, event)
+        if events:
+            interval = min_interval
+            if checkpoint:
+                _save_tail_checkpoint(checkpoint, state)
+        else:
+            interval = min(max_interval, interval * 2)
+        heapq.heappush(
+            schedule, (time.monotonic() + interval, group_name, interval)
+        )
+    return state
 
 
 def main(args):
@@ -65,7 +460,43 @@ def main(args):
             args.func(args.group, args.stream, args.region)
 
         elif args.func.__name__ == "filter_log_events":
-            args.func(args.group, args.filter_pat, args.start, args.stop, args.region)
+            if args.cache:
+                events = search_log_events(
+                    args.group,
+                    args.start,
+                    args.stop,
+                    args.regex,
+                    args.filter_pat,
+                    args.cache,
+                    shards=args.shards,
+                    region_name=args.region,
+                )
+            else:
+                events = args.func(
+                    args.group,
+                    args.filter_pat,
+                    args.start,
+                    args.stop,
+                    args.region,
+                    shards=args.shards,
+                )
+            for event in events:
+                print(event["timestamp"], event["logStreamName"], event["message"])
+
+        elif args.func.__name__ == "tail_log_events":
+            try:
+                args.func(
+                    args.groups,
+                    args.filter_pat,
+                    args.checkpoint,
+                    args.start,
+                    args.min_interval,
+                    args.max_interval,
+                    args.lag,
+                    region_name=args.region,
+                )
+            except KeyboardInterrupt:
+                pass
 
         else:
             print("Invalid/Missing command")
@@ -103,12 +534,49 @@ if __name__ == "__main__":
     sp_filter_log_events.add_argument("group", help="Group Name")
     sp_filter_log_events.add_argument("filter_pat", help="Pattern for filtering logs")
     sp_filter_log_events.add_argument(
-        "--start", help="Filtering logs beginning from this time"
+        "--start",
+        help="Filtering logs beginning from this time (epoch ms, ISO 8601 or 2h)",
     )
     sp_filter_log_events.add_argument(
         "--stop", help="Filtering logs ending at this time"
     )
-    sp_filter_log_events.add_argument("region", help="Region Name")
+    sp_filter_log_events.add_argument(
+        "--shards", help="Time shards fetched at once", type=int, default=1
+    )
+    sp_filter_log_events.add_argument(
+        "--cache", help="Serve repeated queries from this local event store"
+    )
+    sp_filter_log_events.add_argument(
+        "--regex", help="Regex applied locally (requires --cache)"
+    )
+    sp_filter_log_events.add_argument("region", help="Region Name", nargs="?")
+    sp_filter_log_events.set_defaults(func=filter_log_events)
+
+    # _______________Tail log events_______________
+    sp_tail_log_events = sp.add_parser(
+        "tail", help="Follow one or more log groups"
+    )
+    sp_tail_log_events.add_argument("groups", help="Group Names", nargs="+")
+    sp_tail_log_events.add_argument(
+        "--filter-pat", help="Pattern for filtering logs", default=""
+    )
+    sp_tail_log_events.add_argument(
+        "--checkpoint", help="File keeping the position of every group"
+    )
+    sp_tail_log_events.add_argument(
+        "--start", help="Start from this time when there is no checkpoint"
+    )
+    sp_tail_log_events.add_argument(
+        "--min-interval", help="Poll interval (s): 1", type=float, default=1
+    )
+    sp_tail_log_events.add_argument(
+        "--max-interval", help="Quiet group interval (s): 30", type=float, default=30
+    )
+    sp_tail_log_events.add_argument(
+        "--lag", help="Late ingestion window (s): 0", type=float, default=0
+    )
+    sp_tail_log_events.add_argument("--region", help="Region Name")
+    sp_tail_log_events.set_defaults(func=tail_log_events)
 
     args_ = parser.parse_args()
     main(args_)
@@ -1,133 +1,1146 @@
+import base64
+import bisect
+import csv
+import functools
+import gzip
+import itertools
+import json
 import logging
+import math
+import os
+import queue
 import random
+import sys
+import tempfile
+import threading
+import time
 import uuid
 import operator as op
 from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 from pathlib import Path, PosixPath
 from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.types import Binary
 
-import boto3
 from botocore.exceptions import ClientError
 
+from client_manager import get_resource
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='[%(asctime)s] %(levelname)s %(module)s %(lineno)d - %(message)s',)
 log = logging.getLogger()
 
+
+# Token bucket shared by worker threads to cap capacity units per second.
+# acquire() waits for at least one unit; consume() charges what a call
+# actually used, so the balance may go negative and later calls wait.
+# throttled() halves the rate; each consume() wins back 5% of max_rate.
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.max_rate = rate
+        # Room for at least one unit, or a rate below 1/s never acquires
+        self.capacity = max(1, burst or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def consume(self, units):
+        with self.lock:
+            self._refill()
+            self.tokens -= units
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def throttled(self):
+        with self.lock:
+            self._refill()
+            self.rate = max(self.max_rate / 100, self.rate / 2)
+
+
+THROTTLE_ERRORS = (
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+)
+
+# Opt-in metrics registry, filled by _call() once enable_metrics() ran:
+# operation -> calls, latency histogram, consumed RCU/WCU, items and
+# throttles. operation is the dynamo_manager function that issued the
+# request.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+READ_OPS = ('get_products', 'query_products', 'scan_products')
+_metrics = {}
+_metrics_lock = threading.Lock()
+_metrics_enabled = False
+_metrics_started = None
+# Per-second capacity usage, to track the peaks
+_second = {'at': 0, 'rcu': 0.0, 'wcu': 0.0}
+_peaks = {'rcu': 0.0, 'wcu': 0.0}
+
+def enable_metrics(enabled=True):
+    global _metrics_enabled, _metrics_started
+    with _metrics_lock:
+        _metrics_enabled = enabled
+        _metrics.clear()
+        _second.update(at=0, rcu=0.0, wcu=0.0)
+        _peaks.update(rcu=0.0, wcu=0.0)
+        _metrics_started = time.time()
+
+def _capacity_units(consumed):
+    if not consumed:
+        return 0.0
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    return sum(c.get('CapacityUnits', 0) for c in consumed)
+
+def _record(operation, seconds, consumed=None, items=0, throttled=False):
+    units = _capacity_units(consumed)
+    kind = 'rcu' if operation in READ_OPS else 'wcu'
+    with _metrics_lock:
+        m = _metrics.setdefault(operation, {
+            'calls': 0, 'seconds': 0.0,
+            'buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+            'rcu': 0.0, 'wcu': 0.0, 'items': 0, 'throttles': 0,
+        })
+        m['calls'] += 1
+        m['seconds'] += seconds
+        m['buckets'][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        m[kind] += units
+        m['items'] += items
+        m['throttles'] += throttled
+        now = int(time.time())
+        if _second['at'] != now:
+            _second.update(at=now, rcu=0.0, wcu=0.0)
+        _second[kind] += units
+        _peaks[kind] = max(_peaks[kind], _second[kind])
+
+def _item_count(res, params):
+    if 'Count' in res:
+        return res['Count']
+    if 'Responses' in res:
+        return sum(len(items) for items in res['Responses'].values())
+    if 'RequestItems' in params:
+        sent = sum(len(reqs) for reqs in params['RequestItems'].values())
+        unprocessed = sum(
+            len(reqs) for reqs in res.get('UnprocessedItems', {}).values())
+        return sent - unprocessed
+    return 1
+
+# Issue a DynamoDB request, recording it in the registry when enabled
+def _call(operation, func, **params):
+    if not _metrics_enabled:
+        return func(**params)
+    params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+    started = time.perf_counter()
+    try:
+        res = func(**params)
+    except ClientError as err:
+        code = err.response.get('Error', {}).get('Code')
+        _record(operation, time.perf_counter() - started,
+                throttled=code in THROTTLE_ERRORS)
+        raise
+    _record(operation, time.perf_counter() - started,
+            res.get('ConsumedCapacity'), _item_count(res, params))
+    return res
+
+# Snapshot of the registry as a JSON-serializable dict
+def metrics_json():
+    with _metrics_lock:
+        return {
+            'started': _metrics_started,
+            'finished': time.time(),
+            'latency_buckets': list(LATENCY_BUCKETS),
+            'peak_rcu_per_second': _peaks['rcu'],
+            'peak_wcu_per_second': _peaks['wcu'],
+            'operations': json.loads(json.dumps(_metrics)),
+        }
+
+# The registry (or a metrics_json() snapshot) in Prometheus text format
+def metrics_prometheus(snapshot=None):
+    snapshot = snapshot or metrics_json()
+    lines = [
+        '# TYPE dynamo_request_duration_seconds histogram',
+    ]
+    for operation, m in snapshot['operations'].items():
+        total = 0
+        for le, count in zip(
+                [*LATENCY_BUCKETS, '+Inf'], m['buckets']):
+            total += count
+            lines.append(f'dynamo_request_duration_seconds_bucket'
+                         f'{{op="{operation}",le="{le}"}} {total}')
+        lines.append(f'dynamo_request_duration_seconds_sum'
+                     f'{{op="{operation}"}} {m["seconds"]}')
+        lines.append(f'dynamo_request_duration_seconds_count'
+                     f'{{op="{operation}"}} {m["calls"]}')
+    for name, key in (('consumed_rcu', 'rcu'), ('consumed_wcu', 'wcu'),
+                      ('items', 'items'), ('throttles', 'throttles')):
+        lines.append(f'# TYPE dynamo_{name}_total counter')
+        for operation, m in snapshot['operations'].items():
+            lines.append(
+                f'dynamo_{name}_total{{op="{operation}"}} {m[key]}')
+    return '\n'.join(lines) + '\n'
+
+# Save the registry to a JSON file (read back by capacity_report)
+def save_metrics(path):
+    with open(path, 'w') as f:
+        json.dump(metrics_json(), f, indent=2)
+
+# Suggest provisioned capacity or on-demand billing from observed usage.
+# metrics: a metrics_json() snapshot (default: the current registry).
+def capacity_report(table_name='products', metrics=None, resource=None):
+    metrics = metrics or metrics_json()
+    ops = metrics['operations']
+    elapsed = max(metrics['finished'] - (metrics['started'] or 0), 1)
+    used = {
+        kind: sum(m[kind] for m in ops.values()) for kind in ('rcu', 'wcu')
+    }
+    throttles = sum(m['throttles'] for m in ops.values())
+    table = get_table(table_name, resource=resource)
+    provisioned = table.provisioned_throughput or {}
+    report = {
+        'table': table_name,
+        'billing_mode': (table.billing_mode_summary or {}).get(
+            'BillingMode', 'PROVISIONED'),
+        'provisioned_rcu': provisioned.get('ReadCapacityUnits', 0),
+        'provisioned_wcu': provisioned.get('WriteCapacityUnits', 0),
+        'throttles': throttles,
+        'operations': {
+            operation: {
+                'calls': m['calls'],
+                'avg_latency_ms': round(1000 * m['seconds'] / m['calls'], 2),
+                'rcu': m['rcu'],
+                'wcu': m['wcu'],
+                'items': m['items'],
+                'throttles': m['throttles'],
+            }
+            for operation, m in ops.items()
+        },
+    }
+    for kind in ('rcu', 'wcu'):
+        avg = used[kind] / elapsed
+        peak = metrics[f'peak_{kind}_per_second']
+        report[f'avg_{kind}_per_second'] = round(avg, 2)
+        report[f'peak_{kind}_per_second'] = peak
+        # Provision for the peak with 30% headroom
+        report[f'suggested_{kind}'] = max(1, math.ceil(peak / 0.7))
+    # Spiky traffic (peak far above average) is cheaper on demand
+    spiky = any(
+        metrics[f'peak_{kind}_per_second'] >
+        10 * max(report[f'avg_{kind}_per_second'], 0.1)
+        for kind in ('rcu', 'wcu'))
+    report['suggestion'] = 'PAY_PER_REQUEST' if spiky else 'PROVISIONED'
+    return report
+
+# Build a ProjectionExpression from attribute names (placeholders avoid
+# clashes with DynamoDB reserved words such as 'name' or 'size')
+def _projection_params(projection):
+    if not projection:
+        return {}
+    if isinstance(projection, str):
+        return {'ProjectionExpression': projection}
+    names = {f'#p{i}': name for i, name in enumerate(projection)}
+    return {
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names,
+    }
+
+
+# Run generator functions in worker threads, streaming their items back
+# through a bounded queue
+def _iter_parallel(funcs, workers=None):
+    items = queue.Queue(maxsize=1000)
+    done = object()
+    stop = threading.Event()
+
+    def run(func):
+        try:
+            for item in func():
+                if stop.is_set():
+                    return
+                items.put(item)
+        finally:
+            items.put(done)
+
+    with ThreadPoolExecutor(max_workers=workers or len(funcs)) as pool:
+        futures = [pool.submit(run, func) for func in funcs]
+        try:
+            remaining = len(futures)
+            while remaining:
+                item = items.get()
+                if item is done:
+                    remaining -= 1
+                else:
+                    yield item
+        finally:
+            stop.set()
+            while any(not future.done() for future in futures):
+                try:
+                    items.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        for future in futures:
+            future.result()
+
+# Read-through product cache: (category, sku) -> (expires, item), in LRU
+# order. Disabled until enable_product_cache() is called.
+_product_cache = OrderedDict()
+_product_cache_lock = threading.Lock()
+_product_cache_size = 0
+_product_cache_ttl = 60
+
+def enable_product_cache(size=10000, ttl=60):
+    global _product_cache_size, _product_cache_ttl
+    with _product_cache_lock:
+        _product_cache_size = size
+        _product_cache_ttl = ttl
+        _product_cache.clear()
+
+def _cached_product(key):
+    with _product_cache_lock:
+        entry = _product_cache.get(key)
+        if not entry:
+            return
+        if entry[0] < time.monotonic():
+            del _product_cache[key]
+            return
+        _product_cache.move_to_end(key)
+        return entry[1]
+
+def _cache_product(key, item):
+    with _product_cache_lock:
+        if not _product_cache_size:
+            return
+        _product_cache[key] = (time.monotonic() + _product_cache_ttl, item)
+        _product_cache.move_to_end(key)
+        while len(_product_cache) > _product_cache_size:
+            _product_cache.popitem(last=False)
+
+# Drop a product from the read-through cache
+def invalidate_product(category, sku):
+    with _product_cache_lock:
+        _product_cache.pop((category, sku), None)
+
 # Create a DynamoDB Table
-def create_table(table_name, pk, pkdef):
-    ddb = boto3.resource('dynamodb')
+# on_demand=True creates a PAY_PER_REQUEST table instead
+def create_table(table_name, pk, pkdef, resource=None, read_capacity=5,
+                 write_capacity=5, on_demand=False):
+    ddb = resource or get_resource('dynamodb')
+    if on_demand:
+        capacity = {'BillingMode': 'PAY_PER_REQUEST'}
+    else:
+        capacity = {
+            'ProvisionedThroughput': {
+                'ReadCapacityUnits': read_capacity,
+                'WriteCapacityUnits': write_capacity,
+            }
+        }
     table = ddb.create_table(
         TableName=table_name,
         KeySchema=pk,
         AttributeDefinitions=pkdef,
-        ProvisionedThroughput={
-            'ReadCapacityUnits': 5,
-            'WriteCapacityUnits': 5,
-        }
+        **capacity,
     )
     table.meta.client.get_waiter('table_exists').wait(TableName=table_name)
     return table
 
 # Use an existing DynamoDB Table        
-def get_table(table_name):
-    ddb = boto3.resource('dynamodb')
+def get_table(table_name, resource=None):
+    ddb = resource or get_resource('dynamodb')
     return ddb.Table(table_name)
     
+# Attribute used for optimistic locking in update_product
+VERSION_ATTR = 'version'
+
+def _condition_failed(err):
+    return err.response.get('Error', {}).get('Code') == \
+        'ConditionalCheckFailedException'
+
 # Create an Item
-def create_product(category, sku, **item):
-    table = get_table('products')
+# The stored item is returned from the write itself (no read-after-write).
+# overwrite=False refuses to replace an existing product.
+def create_product(category, sku, resource=None, overwrite=True, **item):
+    table = get_table('products', resource=resource)
     keys = {
         'category': category,
         'sku': sku,
     }
     item.update(keys)
-    table.put_item(Item=item)
-    return table.get_item(Key=keys)['Item']
+    params = {'Item': item}
+    if not overwrite:
+        params['ConditionExpression'] = Attr('sku').not_exists()
+    try:
+        _call('create_product', table.put_item, **params)
+        invalidate_product(category, sku)
+    except ClientError as err:
+        if not _condition_failed(err):
+            raise
+        log.warning(f'Product {keys} already exists')
+        return
+    return item
     
+# Compile an update expression for a shape of attribute names. Names
+# always go through placeholders, so reserved words are safe; the
+# compiled expression is reused for every update with the same shape.
+@functools.lru_cache(maxsize=1024)
+def _compile_update(set_names, add_names, remove_names):
+    names = {}
+    clauses = []
+    for clause, prefix, attrs in (('SET', 's', set_names),
+                                  ('ADD', 'a', add_names)):
+        if attrs:
+            names.update({f'#{prefix}{i}': n for i, n in enumerate(attrs)})
+            clauses.append(clause + ' ' + ', '.join(
+                f'#{prefix}{i} = :{prefix}{i}' if clause == 'SET'
+                else f'#{prefix}{i} :{prefix}{i}'
+                for i in range(len(attrs))))
+    if remove_names:
+        names.update({f'#r{i}': n for i, n in enumerate(remove_names)})
+        clauses.append('REMOVE ' + ', '.join(
+            f'#r{i}' for i in range(len(remove_names))))
+    return ' '.join(clauses), tuple(names.items())
+
+# UpdateExpression parameters for SET values, ADD increments and REMOVEs
+def _update_params(set_=None, add=None, remove=None):
+    set_, add = set_ or {}, add or {}
+    expr, names = _compile_update(
+        tuple(set_), tuple(add), tuple(remove or ()))
+    params = {
+        'UpdateExpression': expr,
+        'ExpressionAttributeNames': dict(names),
+    }
+    vals = {f':s{i}': v for i, v in enumerate(set_.values())}
+    vals.update({f':a{i}': v for i, v in enumerate(add.values())})
+    if vals:
+        params['ExpressionAttributeValues'] = vals
+    return params
+
 # Update an Item
-def update_product(category, sku, **item):
-    table = get_table('products')
+# Returns the item as selected by return_values (ALL_NEW, ALL_OLD, ...).
+# With expected_version the update only applies if the stored version
+# matches, and the version is bumped; on a conflict None is returned.
+# add increments numeric attributes atomically; remove drops attributes.
+def update_product(category, sku, resource=None, expected_version=None,
+                   return_values='ALL_NEW', add=None, remove=None, **item):
+    table = get_table('products', resource=resource)
     keys = {
         'category': category,
         'sku': sku,
     }
-    expr = ', '.join([f'{k}=:{k}' for k in item.keys()])
-    vals = {f':{k}': v for k, v in item.items()}
-    table.update_item(
-        Key=keys,
-        UpdateExpression=f'SET {expr}',
-        ExpressionAttributeValues=vals,
-    )
-    return table.get_item(Key=keys)['Item']
+    condition = {}
+    if expected_version is not None:
+        item[VERSION_ATTR] = expected_version + 1
+        condition['ConditionExpression'] = \
+            Attr(VERSION_ATTR).eq(expected_version)
+    params = _update_params(item, add, remove)
+    try:
+        res = _call(
+            'update_product',
+            table.update_item,
+            Key=keys,
+            ReturnValues=return_values,
+            **params,
+            **condition,
+        )
+        invalidate_product(category, sku)
+    except ClientError as err:
+        if not _condition_failed(err):
+            raise
+        log.warning(f'Product {keys} is not at version {expected_version}')
+        return
+    return res.get('Attributes')
+
+# Fold updates of the same item into one, in order: a transaction may
+# touch each item only once, and an update expression may name each
+# attribute only once. Later 'set' values win, 'add' increments are
+# summed (or folded into an earlier 'set'), a 'remove' drops earlier
+# changes of the attribute and a later 'set' or 'add' cancels it.
+def _merge_updates(updates):
+    merged = {}
+    for category, sku, changes in updates:
+        entry = merged.setdefault(
+            (category, sku), {'set': {}, 'add': {}, 'remove': []})
+        for attr, value in (changes.get('set') or {}).items():
+            entry['set'][attr] = value
+            entry['add'].pop(attr, None)
+            if attr in entry['remove']:
+                entry['remove'].remove(attr)
+        for attr, value in (changes.get('add') or {}).items():
+            if attr in entry['set']:
+                entry['set'][attr] += value
+            elif attr in entry['remove']:
+                # Adding to a removed attribute starts it from the increment
+                entry['remove'].remove(attr)
+                entry['set'][attr] = value
+            else:
+                entry['add'][attr] = entry['add'].get(attr, 0) + value
+        for attr in changes.get('remove') or ():
+            entry['set'].pop(attr, None)
+            entry['add'].pop(attr, None)
+            if attr not in entry['remove']:
+                entry['remove'].append(attr)
+    return [(category, sku, {k: v for k, v in changes.items() if v})
+            for (category, sku), changes in merged.items()]
+
+# Apply one group of updates as a single all-or-nothing transaction.
+# The resource's client serializes keys and values itself.
+def _transact_updates(table_name, group, client=None):
+    client = client or get_resource('dynamodb').meta.client
+    actions = []
+    for category, sku, changes in group:
+        actions.append({'Update': {
+            'TableName': table_name,
+            'Key': {'category': category, 'sku': sku},
+            **_update_params(changes.get('set'), changes.get('add'),
+                             changes.get('remove')),
+        }})
+    _call('update_products', client.transact_write_items,
+          TransactItems=actions)
+    return len(group)
+
+# Apply one update on its own
+def _single_update(table_name, category, sku, changes, client=None):
+    client = client or get_resource('dynamodb').meta.client
+    _call('update_products', client.update_item,
+          TableName=table_name,
+          Key={'category': category, 'sku': sku},
+          **_update_params(changes.get('set'), changes.get('add'),
+                           changes.get('remove')))
+    return 1
+
+# Update Items (Batch)
+# updates: iterable of (category, sku, changes) where changes may hold
+# 'set' ({attr: value}), 'add' ({attr: increment}) and 'remove' ([attr]).
+# Updates of the same item are merged first, in order (see
+# _merge_updates), so concurrent calls never race on one item. They then
+# run concurrently, or with transactional=True as TransactWriteItems
+# groups of up to 100 that each apply all-or-nothing.
+# Returns the number of items updated; failures are logged.
+def update_products(updates, workers=8, transactional=False,
+                    table_name='products', resource=None):
+    updates = _merge_updates(updates)
+    # Resources are not thread-safe, their clients are
+    client = resource.meta.client if resource else None
+    if transactional:
+        tasks = [
+            (_transact_updates, table_name, updates[i:i + 100], client)
+            for i in range(0, len(updates), 100)
+        ]
+    else:
+        tasks = [(_single_update, table_name, *update, client)
+                 for update in updates]
+
+    def run(task):
+        func, *args = task
+        try:
+            return func(*args)
+        except ClientError as err:
+            log.error(f'Update failed: {err}')
+            return 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        updated = sum(pool.map(run, tasks))
+    for category, sku, _ in updates:
+        invalidate_product(category, sku)
+    log.info(f'Updated {updated}/{len(updates)} items in {table_name}')
+    return updated
 
 # Delete an Item
-def delete_product(category, sku):
-    table = get_table('products')
+def delete_product(category, sku, resource=None):
+    table = get_table('products', resource=resource)
     keys = {
         'category': category,
         'sku': sku,
     }
-    res = table.delete_item(Key=keys)
+    res = _call('delete_product', table.delete_item, Key=keys)
+    invalidate_product(category, sku)
     if res.get('ResponseMetadata', {}).get('HTTPStatusCode') == 200:
         return True
     else:
         log.error(f'There was an error when deleting the product: {res}')
         return False
         
+# Fetch up to 100 keys, retrying UnprocessedKeys with jittered backoff.
+# Runs on pool threads: without a (thread-safe) client, each thread uses
+# its own resource.
+def _batch_get(table_name, keys, max_retries=8, client=None):
+    ddb = client or get_resource('dynamodb').meta.client
+    request = {table_name: {'Keys': keys}}
+    items = []
+    for attempt in range(max_retries + 1):
+        res = _call('get_products', ddb.batch_get_item,
+                    RequestItems=request)
+        items.extend(res['Responses'].get(table_name, []))
+        request = res.get('UnprocessedKeys')
+        if not request:
+            return items
+        if attempt < max_retries:
+            time.sleep(random.uniform(0, min(5, 0.05 * 2 ** attempt)))
+    log.error(f'{len(request[table_name]["Keys"])} keys left unprocessed')
+    return items
+
+# Get Items (Batch)
+# keys: iterable of (category, sku). Returns {(category, sku): item} for
+# the products that exist, served from the cache when it is enabled.
+def get_products(keys, resource=None, workers=8, table_name='products'):
+    found = {}
+    missing = []
+    for key in dict.fromkeys(keys):
+        item = _cached_product(key)
+        if item is not None:
+            found[key] = item
+        else:
+            missing.append({'category': key[0], 'sku': key[1]})
+    chunks = [missing[i:i + 100] for i in range(0, len(missing), 100)]
+    # Resources are not thread-safe, their clients are
+    client = resource.meta.client if resource else None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for items in pool.map(
+                lambda chunk: _batch_get(table_name, chunk, client=client),
+                chunks):
+            for item in items:
+                key = (item['category'], item['sku'])
+                found[key] = item
+                _cache_product(key, item)
+    return found
+
+# Write one batch of up to 25 items, retrying unprocessed items and
+# throttled calls with jittered backoff. Returns (retries, throttles).
+def _write_batch(ddb, table_name, batch, limiter=None, max_retries=10):
+    request = {table_name: [{'PutRequest': {'Item': item}} for item in batch]}
+    retries = throttles = 0
+    for attempt in range(max_retries + 1):
+        if attempt:
+            retries += 1
+            time.sleep(random.uniform(0, min(5, 0.05 * 2 ** attempt)))
+        if limiter:
+            limiter.acquire()
+        try:
+            res = _call('create_items', ddb.batch_write_item,
+                        RequestItems=request, ReturnConsumedCapacity='TOTAL')
+        except ClientError as err:
+            if err.response.get('Error', {}).get('Code') not in THROTTLE_ERRORS:
+                raise
+            throttles += 1
+            if limiter:
+                limiter.throttled()
+            continue
+        if limiter:
+            limiter.consume(sum(
+                c['CapacityUnits'] for c in res.get('ConsumedCapacity', [])))
+        request = res.get('UnprocessedItems')
+        if not request:
+            return retries, throttles
+    raise RuntimeError(
+        f'{len(request[table_name])} items still unwritten after '
+        f'{max_retries} retries')
+
+# Writer thread: pull items off the queue and write them 25 at a time
+def _batch_writer_worker(table_name, pending, keys, limiter, stats, lock,
+                         client=None):
+    ddb = client or get_resource('dynamodb').meta.client
+    done = False
+    while not done:
+        batch = {}
+        while len(batch) < 25:
+            item = pending.get()
+            if item is None:
+                done = True
+                break
+            # Like overwrite_by_pkeys: the last item for a key wins
+            key = tuple(item[k] for k in keys) if keys else len(batch)
+            batch[key] = item
+        if not batch:
+            continue
+        retries, throttles = _write_batch(
+            ddb, table_name, list(batch.values()), limiter)
+        with lock:
+            stats['items'] += len(batch)
+            stats['retries'] += retries
+            stats['throttles'] += throttles
+
 # Create an Item (Batch)
-def create_items(table_name, items, keys=None):
-    table = get_table(table_name)
-    params = {
-        'overwrite_by_pkeys': keys
-    } if keys else {}
-    with table.batch_writer(**params) as batch:
-        for item in items:
-            batch.put_item(Item=item)
+# workers > 1 spreads the writes over that many threads, each batching
+# its own BatchWriteItem calls; rate_limit caps the write capacity units
+# consumed per second and backs off further when DynamoDB throttles.
+def create_items(table_name, items, keys=None, resource=None, workers=1,
+                 rate_limit=None):
+    # batch_writer hides ConsumedCapacity, so metrics use the writer path
+    if workers <= 1 and not rate_limit and not _metrics_enabled:
+        table = get_table(table_name, resource=resource)
+        params = {
+            'overwrite_by_pkeys': keys
+        } if keys else {}
+        with table.batch_writer(**params) as batch:
+            for item in items:
+                batch.put_item(Item=item)
+        return True
+
+    workers = max(workers, 1)
+    limiter = TokenBucket(rate_limit) if rate_limit else None
+    pending = queue.Queue(maxsize=workers * 100)
+    stats = {'items': 0, 'retries': 0, 'throttles': 0}
+    lock = threading.Lock()
+    # Resources are not thread-safe, their clients are
+    client = resource.meta.client if resource else None
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_batch_writer_worker, table_name, pending, keys,
+                        limiter, stats, lock, client)
+            for _ in range(workers)
+        ]
+
+        def feed(item):
+            # Stop feeding (instead of blocking) once every writer is gone
+            while not all(future.done() for future in futures):
+                try:
+                    return pending.put(item, timeout=1)
+                except queue.Full:
+                    pass
+
+        try:
+            for item in items:
+                # A writer only finishes early when it failed
+                if any(future.done() for future in futures):
+                    break
+                feed(item)
+        finally:
+            for _ in futures:
+                feed(None)
+        for future in futures:
+            future.result()
+
+    elapsed = time.monotonic() - started
+    log.info(
+        f"Wrote {stats['items']} items to {table_name} in {elapsed:.1f}s "
+        f"({stats['items'] / (elapsed or 1e-9):.0f} items/s), "
+        f"{stats['retries']} retries, {stats['throttles']} throttles")
     return True
 
+# Convert a CSV cell according to a column type: N, S, BOOL or JSON
+def _convert_cell(value, type_='S'):
+    if type_ == 'N':
+        return Decimal(value)
+    if type_ == 'BOOL':
+        return value.strip().lower() in ('1', 'true', 'yes', 'y')
+    if type_ == 'JSON':
+        return json.loads(value, parse_float=Decimal)
+    return value
+
+# Read items from an NDJSON or CSV file one record at a time, yielding
+# (item, byte offset just past its record). Numbers become Decimal without
+# going through float. types maps CSV columns to N, S, BOOL or JSON.
+def iter_file_items(file_path, fmt=None, types=None, offset=0):
+    fmt = fmt or ('csv' if str(file_path).endswith('.csv') else 'ndjson')
+    types = types or {}
+    with open(file_path, 'rb') as f:
+        if fmt != 'csv':
+            f.seek(offset)
+            for line in iter(f.readline, b''):
+                offset += len(line)
+                if line.strip():
+                    yield json.loads(line, parse_float=Decimal), offset
+            return
+
+        # csv.reader pulls exactly the lines of one record (quoted cells
+        # may span several), so position is always at a record boundary
+        # once a row comes out
+        position = 0
+
+        def lines():
+            nonlocal position
+            for line in iter(f.readline, b''):
+                position += len(line)
+                yield line.decode('utf-8-sig' if position == len(line)
+                                  else 'utf-8')
+
+        reader = csv.reader(lines())
+        header = next(reader, None)
+        if header is None:
+            return
+        if offset > position:
+            f.seek(offset)
+            position = offset
+        for row in reader:
+            if not row:
+                continue
+            # Empty cells are left out: DynamoDB rejects empty keys
+            item = {
+                col: _convert_cell(value, types.get(col, 'S'))
+                for col, value in zip(header, row) if value != ''
+            }
+            yield item, position
+
+def _load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'offset': 0, 'items': 0}
+
+def _save_checkpoint(path, checkpoint):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+# Import Items from an NDJSON/CSV file (Batch)
+# The file is streamed in batches of batch_size items into create_items.
+# With a checkpoint file, the byte offset after each written batch is
+# saved so a rerun resumes where the last one stopped.
+def import_items(table_name, file_path, fmt=None, keys=None, types=None,
+                 checkpoint=None, batch_size=10000, workers=1,
+                 rate_limit=None, resource=None):
+    state = _load_checkpoint(checkpoint) if checkpoint else \
+        {'offset': 0, 'items': 0}
+    if state['offset']:
+        log.info(f"Resuming {file_path} at byte {state['offset']} "
+                 f"({state['items']} items already imported)")
+    rows = iter_file_items(file_path, fmt, types, state['offset'])
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        create_items(table_name, [item for item, _ in batch], keys,
+                     resource=resource, workers=workers,
+                     rate_limit=rate_limit)
+        state = {'offset': batch[-1][1], 'items': state['items'] + len(batch)}
+        if checkpoint:
+            _save_checkpoint(checkpoint, state)
+        log.info(f"Imported {state['items']} items from {file_path}")
+    return state['items']
+
 # Search items (Batch)
-def query_products(key_expr, filter_expr=None):
+def query_products(key_expr, filter_expr=None, resource=None, projection=None,
+                   page_size=None, forward=True, index_name=None,
+                   max_items=None, on_page=None, table_name='products'):
     # Query requires that you provide the key filters
-    table = get_table('products')
+    # Items are streamed back page by page until max_items is reached.
+    # on_page(res) receives each page's Count, ScannedCount and
+    # ConsumedCapacity (read units) with the Items removed.
+    table = get_table(table_name, resource=resource)
     params = {
         'KeyConditionExpression': key_expr,
+        'ScanIndexForward': forward,
+        'ReturnConsumedCapacity': 'INDEXES' if index_name else 'TOTAL',
     }
+    params.update(_projection_params(projection))
     if filter_expr:
         params['FilterExpression'] = filter_expr
-    res = table.query(**params)
-    return res['Items']
-    
+    if index_name:
+        params['IndexName'] = index_name
+    if page_size:
+        params['Limit'] = page_size
+    count = 0
+    while True:
+        if max_items and page_size:
+            # Do not read past what the caller asked for
+            params['Limit'] = min(page_size, max_items - count)
+        res = _call('query_products', table.query, **params)
+        items = res.pop('Items')
+        if on_page:
+            on_page(res)
+        for item in items:
+            yield item
+            count += 1
+            if max_items and count >= max_items:
+                return
+        if 'LastEvaluatedKey' not in res:
+            return
+        params['ExclusiveStartKey'] = res['LastEvaluatedKey']
+
+# Scan one segment of a table, following LastEvaluatedKey.
+# Runs on pool threads: without a (thread-safe) client, each thread uses
+# its own resource.
+def _scan_segment(table_name, params, limiter=None, client=None):
+    ddb = client or get_resource('dynamodb').meta.client
+    params = dict(params, TableName=table_name)
+    if limiter:
+        params['ReturnConsumedCapacity'] = 'TOTAL'
+    while True:
+        if limiter:
+            limiter.acquire()
+        res = _call('scan_products', ddb.scan, **params)
+        if limiter:
+            limiter.consume(res['ConsumedCapacity']['CapacityUnits'])
+        yield from res['Items']
+        if 'LastEvaluatedKey' not in res:
+            return
+        params['ExclusiveStartKey'] = res['LastEvaluatedKey']
+
 # Scan products (Batch)
-def scan_products(filter_expr):
+def scan_products(filter_expr=None, resource=None, segments=1,
+                  projection=None, rate_limit=None, table_name='products'):
 # Scan does not require a key filter. It will go through
 # all items in your table and return all matching items.
 # Use with caution!
-    table = get_table('products')
-    params = {
-        'FilterExpression': filter_expr,
-    }
-    res = table.scan(**params)
-    return res['Items']
+# Items are streamed back; segments > 1 scans in parallel and
+# rate_limit caps the read capacity units consumed per second.
+    params = _projection_params(projection)
+    if filter_expr:
+        params['FilterExpression'] = filter_expr
+    limiter = TokenBucket(rate_limit) if rate_limit else None
+    client = resource.meta.client if resource else None
+    if segments <= 1:
+        return _scan_segment(table_name, params, limiter, client)
+    return _iter_parallel([
+        lambda segment=segment: _scan_segment(
+            table_name,
+            dict(params, Segment=segment, TotalSegments=segments),
+            limiter,
+            client,
+        )
+        for segment in range(segments)
+    ])
     
+# Encode the non-numeric DynamoDB types json cannot
+def _json_default(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, Binary):
+        value = value.value
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode()
+    raise TypeError(f'Cannot export {type(value).__name__}')
+
+# DynamoDB numbers: ints when integral, exact Decimals otherwise
+def _number(value):
+    return int(value) if value == value.to_integral_value() else value
+
+# Encode an item as JSON. Numbers are written with their exact digits:
+# json.dumps would need a float (losing digits) or a string (changing
+# the type of the attribute from one item to the next).
+def _to_json(value):
+    if isinstance(value, dict):
+        return '{' + ','.join(
+            f'{json.dumps(k)}:{_to_json(v)}' for k, v in value.items()) + '}'
+    if isinstance(value, (list, tuple, set, frozenset)):
+        if isinstance(value, (set, frozenset)):
+            value = sorted(value)
+        return '[' + ','.join(map(_to_json, value)) + ']'
+    if isinstance(value, Decimal):
+        return str(_number(value))
+    return json.dumps(value, default=_json_default)
+
+# Convert an item to plain Python values (for columnar writers); numbers
+# stay exact, as ints or Decimals
+def _plain(value):
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, set, frozenset)):
+        return [_plain(v) for v in
+                (sorted(value) if not isinstance(value, list) else value)]
+    if isinstance(value, Decimal):
+        return _number(value)
+    if isinstance(value, (str, bool, int, float)) or value is None:
+        return value
+    return _json_default(value)
+
+def _write_ndjson(path, items, compress):
+    opener = gzip.open if compress else open
+    count = 0
+    with opener(path, 'wt', encoding='utf-8') as f:
+        for item in items:
+            f.write(_to_json(item))
+            f.write('\n')
+            count += 1
+    return count
+
+# Rows are spooled to a temporary file while the schemas of all row
+# groups are unified, then written in a second pass, so attributes that
+# only show up late are kept. Numbers are exact: int64 columns widen to
+# decimal once a fractional value shows up. Conflicting types (e.g. a
+# number in one item, a string in another) raise an error.
+def _write_parquet(path, items, compress, row_group_size=10000):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('Parquet export requires pyarrow to be installed')
+    schema = None
+    count = 0
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as spool:
+        while True:
+            rows = [_plain(item)
+                    for item in itertools.islice(items, row_group_size)]
+            if not rows:
+                break
+            # from_pylist only looks at the first row's keys
+            group_schema = pa.schema(list(pa.array(rows).type))
+            try:
+                schema = group_schema if schema is None else \
+                    pa.unify_schemas([schema, group_schema],
+                                     promote_options='permissive')
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as err:
+                raise RuntimeError(
+                    f'Cannot export {path} to Parquet: {err}') from err
+            for row in rows:
+                spool.write(_to_json(row))
+                spool.write('\n')
+            count += len(rows)
+        if schema is None:
+            return 0
+        spool.seek(0)
+        with pq.ParquetWriter(
+                path, schema,
+                compression='zstd' if compress else 'none') as writer:
+            lines = iter(spool.readline, '')
+            while True:
+                rows = [json.loads(line, parse_float=Decimal)
+                        for line in itertools.islice(lines, row_group_size)]
+                if not rows:
+                    break
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+    return count
+
+# Export one scan segment to its own file
+def _export_segment(table_name, params, path, fmt, compress, limiter,
+                    client=None):
+    items = _scan_segment(table_name, params, limiter, client)
+    started = time.monotonic()
+    if fmt == 'parquet':
+        count = _write_parquet(path, items, compress)
+    else:
+        count = _write_ndjson(path, items, compress)
+    if not os.path.exists(path):
+        return None
+    return {
+        'path': os.path.basename(path),
+        'items': count,
+        'bytes': os.path.getsize(path),
+        'seconds': round(time.monotonic() - started, 3),
+    }
+
+# Export a table (Batch)
+# Runs a parallel segmented scan and writes one NDJSON (gzip) or Parquet
+# (zstd) file per segment plus a manifest.json describing the export.
+def export_table(table_name, dest, fmt='ndjson', segments=4, compress=True,
+                 projection=None, rate_limit=None, resource=None):
+    dest = Path(dest)
+    dest.mkdir(parents=True, exist_ok=True)
+    ext = 'parquet' if fmt == 'parquet' else \
+        'ndjson.gz' if compress else 'ndjson'
+    params = _projection_params(projection)
+    limiter = TokenBucket(rate_limit) if rate_limit else None
+    # Resources are not thread-safe, their clients are
+    client = resource.meta.client if resource else None
+    started = datetime.utcnow()
+    with ThreadPoolExecutor(max_workers=segments) as pool:
+        files = list(pool.map(
+            lambda segment: _export_segment(
+                table_name,
+                dict(params, Segment=segment, TotalSegments=segments),
+                dest.joinpath(f'part-{segment:05d}.{ext}'),
+                fmt, compress, limiter, client),
+            range(segments)))
+    files = [f for f in files if f]
+    manifest = {
+        'table': table_name,
+        'format': fmt,
+        'compression': ('zstd' if fmt == 'parquet' else 'gzip')
+        if compress else None,
+        'segments': segments,
+        'started': started.isoformat() + 'Z',
+        'finished': datetime.utcnow().isoformat() + 'Z',
+        'items': sum(f['items'] for f in files),
+        'files': files,
+    }
+    with open(dest.joinpath('manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    log.info(f"Exported {manifest['items']} items from {table_name} "
+             f"to {dest} ({len(files)} files)")
+    return manifest
+
 # Delete a table
-def delete_dynamo_table(table_name):
-    table = get_table(table_name)
+def delete_dynamo_table(table_name, resource=None):
+    table = get_table(table_name, resource=resource)
     table.delete()
     table.wait_until_not_exists()
     return True
     
-def main(args_)
-    if hasattr(args_, 'func')
-        if args_.func.__name__ == 'create_table'
+def main(args_):
+    if hasattr(args_, 'func'):
+        if args_.metrics:
+            enable_metrics()
+        if args_.func.__name__ == 'create_table':
+            args_.func(args_.name, json.loads(args_.key_schema),
+                       json.loads(args_.attribute_definition))
+        elif args_.func.__name__ == 'get_table':
             args_.func(args_.name)
-        elif args_.func.__name__ == 'get_table'
+        elif args_.func.__name__ in ('create_product', 'update_product',
+                                     'delete_product'):
+            print(args_.func(args_.catergory, args_.sku))
+        elif args_.func.__name__ == 'delete_dynamo_table':
+            args_.func(args_.table_name)
+        elif args_.func.__name__ == 'create_items':
+            args_.func(args_.table_name, json.loads(args_.items),
+                       json.loads(args_.keys), workers=args_.workers,
+                       rate_limit=args_.rate_limit)
+        elif args_.func.__name__ == 'import_items':
+            args_.func(args_.table_name, args_.file_path, args_.format,
+                       args_.keys, json.loads(args_.types or '{}'),
+                       args_.checkpoint, args_.batch_size, args_.workers,
+                       args_.rate_limit)
+        elif args_.func.__name__ == 'capacity_report':
+            with open(args_.metrics_file) as f:
+                snapshot = json.load(f)
+            if args_.prometheus:
+                print(metrics_prometheus(snapshot), end='')
+            else:
+                print(json.dumps(
+                    args_.func(args_.table_name, snapshot), indent=2))
+        elif args_.func.__name__ == 'export_table':
+            args_.func(args_.table_name, args_.dest, args_.format,
+                       args_.segments, not args_.no_compress,
+                       args_.projection, args_.rate_limit)
+        elif args_.func.__name__ == 'query_products':
+            for item in args_.func(args_.key_condition_expression,
+                                   args_.filter_expression,
+                                   projection=args_.projection,
+                                   page_size=args_.limit,
+                                   forward=not args_.reverse,
+                                   index_name=args_.index,
+                                   max_items=args_.max_items,
+                                   on_page=lambda res: log.info(
+                                       f"Page: {res['Count']} items, "
+                                       f"{res.get('ConsumedCapacity')}")):
+                print(item)
+        elif args_.func.__name__ == 'scan_products':
+            for item in args_.func(args_.filter_expression,
+                                   segments=args_.segments,
+                                   projection=args_.projection,
+                                   rate_limit=args_.rate_limit):
+                print(item)
+        else:
+            log.error('Invalid/Missing command.')
+            sys.exit(1)
+        if args_.metrics:
+            save_metrics(args_.metrics)
+        print('Done')
 
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser()
+    parser.add_argument('--metrics', help = 'Record latency/capacity metrics into this JSON file', default = None)
     # Subparser for Adhoc Processing
     sp = parser.add_subparsers( title = 'Adhoc Commands')
     
@@ -136,15 +1149,18 @@ if __name__ == '__main__':
     sp_create_table.add_argument('name', help = 'Name of table to be created',)
     sp_create_table.add_argument('key_schema', help = 'KeySchema of table to be created',)
     sp_create_table.add_argument('attribute_definition', help = 'Attribute Definition of table to be created',)
+    sp_create_table.set_defaults(func=create_table)
 
     #_______________Use an existing table subcommand_______________
     sp_get_table = sp.add_parser('get_table', help = 'Use an existing DynamoDB Table',)
     sp_get_table.add_argument('name', help = 'Name of table to be used',)
+    sp_get_table.set_defaults(func=get_table)
     
     #_______________Create an Item subcommand_______________
     sp_create_product = sp.add_parser('create_product', help = 'Create an Item',)
     sp_create_product.add_argument('catergory', help = 'Category for the item to be created',)
     sp_create_product.add_argument('sku', help = 'SKU of item to be created')
+    sp_create_product.set_defaults(func=create_product)
     '''for **item'''
     #sp_create_product.add_argument('item')
     
@@ -152,6 +1168,7 @@ if __name__ == '__main__':
     sp_update_product = sp.add_parser('update_product', help = 'Update an Item',)
     sp_update_product.add_argument('catergory', help = 'Category for the item to be updated')
     sp_update_product.add_argument('sku', help = 'SKU of item to be updated')
+    sp_update_product.set_defaults(func=update_product)
     '''for **item'''
     #sp_create_product.add_argument('item')
     
@@ -159,30 +1176,76 @@ if __name__ == '__main__':
     sp_delete_product = sp.add_parser('delete_product', help = 'Delete an Item',)
     sp_delete_product.add_argument('catergory', help = 'Category for the item to be deleted')
     sp_delete_product.add_argument('sku', help = 'SKU of item to be deleted')
+    sp_delete_product.set_defaults(func=delete_product)
     
     #_______________Delete a table______________
     sp_delete_table = sp.add_parser('delete_table', help = 'Delete a Table')
     sp_delete_table.add_argument('table_name', help = 'Name of table to be deleted',)
+    sp_delete_table.set_defaults(func=delete_dynamo_table)
     
-    # Subparser for Batch Processing
-    spb = parser.add_subparsers( title = 'Batch processing commands')
+    # Batch Processing (argparse allows a single subparser group)
+    spb = sp
     
     #_______________Create Items_______________
     spb_create_items = spb.add_parser('create_items', help = 'Create DynamoDB items',)
     spb_create_items.add_argument('table_name', help = 'Table for the items to be created',)
     spb_create_items.add_argument('items', help = 'Items to be created',)
     spb_create_items.add_argument('keys', help = 'Item keys')
+    spb_create_items.add_argument('--workers', help = 'Writer threads: 1 (default)', type = int, default = 1)
+    spb_create_items.add_argument('--rate-limit', help = 'Max write capacity units per second', type = float, default = None)
+    spb_create_items.set_defaults(func=create_items)
+
+    #_______________Import Items_______________
+    spb_import_items = spb.add_parser('import_items', help = 'Stream DynamoDB items from an NDJSON/CSV file',)
+    spb_import_items.add_argument('table_name', help = 'Table for the items to be created',)
+    spb_import_items.add_argument('file_path', help = 'NDJSON or CSV file to import',)
+    spb_import_items.add_argument('--format', help = 'ndjson or csv (default: from the file extension)', choices = ('ndjson', 'csv'), default = None)
+    spb_import_items.add_argument('--keys', help = 'Item keys', nargs = '+', default = None)
+    spb_import_items.add_argument('--types', help = 'CSV column types as JSON, e.g. {"price": "N"}', default = None)
+    spb_import_items.add_argument('--checkpoint', help = 'Checkpoint file to resume from', default = None)
+    spb_import_items.add_argument('--batch-size', help = 'Items per batch: 10000 (default)', type = int, default = 10000)
+    spb_import_items.add_argument('--workers', help = 'Writer threads: 1 (default)', type = int, default = 1)
+    spb_import_items.add_argument('--rate-limit', help = 'Max write capacity units per second', type = float, default = None)
+    spb_import_items.set_defaults(func=import_items)
+
+    #_______________Export a table_______________
+    spb_export_table = spb.add_parser('export_table', help = 'Export a table to NDJSON or Parquet files',)
+    spb_export_table.add_argument('table_name', help = 'Table to be exported',)
+    spb_export_table.add_argument('dest', help = 'Directory for the exported files',)
+    spb_export_table.add_argument('--format', help = 'ndjson (default) or parquet', choices = ('ndjson', 'parquet'), default = 'ndjson')
+    spb_export_table.add_argument('--segments', help = 'Parallel scan segments / output files: 4 (default)', type = int, default = 4)
+    spb_export_table.add_argument('--no-compress', help = 'Write uncompressed files', action = 'store_true')
+    spb_export_table.add_argument('--projection', help = 'Attributes to export', nargs = '+', default = None)
+    spb_export_table.add_argument('--rate-limit', help = 'Max read capacity units per second', type = float, default = None)
+    spb_export_table.set_defaults(func=export_table)
     
+    #_______________Capacity report_______________
+    spb_capacity_report = spb.add_parser('capacity_report', help = 'Suggest table capacity from recorded metrics',)
+    spb_capacity_report.add_argument('table_name', help = 'Table the metrics were recorded against',)
+    spb_capacity_report.add_argument('metrics_file', help = 'Metrics JSON saved with --metrics',)
+    spb_capacity_report.add_argument('--prometheus', help = 'Print the metrics in Prometheus text format instead', action = 'store_true')
+    spb_capacity_report.set_defaults(func=capacity_report)
+
     #_______________Search Items_______________
-    # Subparser for search items
-    spbs = parser.add_subparsers( title = 'Search item commands')
+    # Search items
+    spbs = sp
     #---------------Query items---------------
     spbs_search_items = spbs.add_parser('query_products', help = 'Search items with key filter',)
     spbs_search_items.add_argument('key_condition_expression', help = 'Key Condition Expression',)
-    spbs_search_items.add_argument('filter_expression', help = 'Expression filter',)
+    spbs_search_items.add_argument('filter_expression', help = 'Expression filter', nargs = '?', default = None)
+    spbs_search_items.add_argument('--index', help = 'GSI/LSI to query', default = None)
+    spbs_search_items.add_argument('--limit', help = 'Items per page', type = int, default = None)
+    spbs_search_items.add_argument('--max-items', help = 'Stop after this many items', type = int, default = None)
+    spbs_search_items.add_argument('--reverse', help = 'Descending sort key order', action = 'store_true')
+    spbs_search_items.add_argument('--projection', help = 'Attributes to return', nargs = '+', default = None)
+    spbs_search_items.set_defaults(func=query_products)
     #---------------Scan Products---------------
     spbs_scan_products = spbs.add_parser('scan_products', help = 'Search items without a key filter',)
-    spbs_scan_products.add_argument('filter_expression', help = 'Expression filter',)
+    spbs_scan_products.add_argument('filter_expression', help = 'Expression filter', nargs = '?', default = None)
+    spbs_scan_products.add_argument('--segments', help = 'Parallel scan segments: 1 (default)', type = int, default = 1)
+    spbs_scan_products.add_argument('--projection', help = 'Attributes to return', nargs = '+', default = None)
+    spbs_scan_products.add_argument('--rate-limit', help = 'Max read capacity units per second', type = float, default = None)
+    spbs_scan_products.set_defaults(func=scan_products)
     
     args_ = parser.parse_args()
     main(args_)
\ No newline at end of file
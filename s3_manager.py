@@ -1,23 +1,74 @@
+import glob
+import hashlib
+import itertools
+import json
 import logging
+import mmap
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
 import uuid
 import sys
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
 from pathlib import Path, PosixPath
 
 
-import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 
+from client_manager import get_client, get_resource
+
 logging.basicConfig(
     level=logging.INFO,
     format="[%(asctime)s] %(levelname)s %(module)s %(lineno)d - %(message)s",
 )
 log = logging.getLogger()
 
+MB = 1024**2
+
+# Bucket metadata cache: name -> {"expires", "region", "versioning"}
+BUCKET_CACHE_TTL = 300
+_bucket_cache = {}
+_bucket_cache_lock = threading.Lock()
+
+
+def _cached_bucket(name):
+    with _bucket_cache_lock:
+        entry = _bucket_cache.get(name)
+        if entry and entry["expires"] > time.monotonic():
+            return entry
+        _bucket_cache.pop(name, None)
+
+
+def _cache_bucket(name, **meta):
+    with _bucket_cache_lock:
+        entry = _bucket_cache.setdefault(name, {})
+        entry.update(meta)
+        entry["expires"] = time.monotonic() + BUCKET_CACHE_TTL
+        return entry
+
+
+# Drop cached metadata for a bucket (or every bucket)
+def invalidate_bucket(name=None):
+    with _bucket_cache_lock:
+        if name:
+            _bucket_cache.pop(name, None)
+        else:
+            _bucket_cache.clear()
+
 
 # Create Bucket
-def create_bucket(name, region=None):
+def create_bucket(name, region=None, client=None):
     region = region or "ap-southeast-1"
-    client = boto3.client("s3", region_name=region)
+    client = client or get_client("s3", region_name=region)
     params = {
         "Bucket": name,
         "CreateBucketConfiguration": {
@@ -27,6 +78,7 @@ def create_bucket(name, region=None):
 
     try:
         client.create_bucket(**params)
+        invalidate_bucket(name)
         log.info(f"Bucket {name} created")
         return True
 
@@ -36,8 +88,8 @@ def create_bucket(name, region=None):
 
 
 # List Bucket
-def list_buckets():
-    s3 = boto3.resource("s3")
+def list_buckets(resource=None):
+    s3 = resource or get_resource("s3")
 
     count = 0
     for bucket in s3.buckets.all():
@@ -47,101 +99,857 @@ def list_buckets():
     print(f"Found {count} buckets!")
 
 
+# List bucket objects (generator over every ListObjectsV2 page)
+def iter_bucket_objects(
+    bucket_name,
+    key_prefix=None,
+    delimiter=None,
+    start_after=None,
+    client=None,
+):
+    client = client or get_client("s3")
+    params = {"Bucket": bucket_name, "Prefix": key_prefix or ""}
+    if delimiter:
+        params["Delimiter"] = delimiter
+    if start_after:
+        params["StartAfter"] = start_after
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(**params):
+        yield from page.get("Contents", [])
+
+
+# List the common prefixes directly under a key prefix
+def list_common_prefixes(
+    bucket_name, key_prefix=None, delimiter="/", client=None
+):
+    client = client or get_client("s3")
+    paginator = client.get_paginator("list_objects_v2")
+    params = {
+        "Bucket": bucket_name,
+        "Prefix": key_prefix or "",
+        "Delimiter": delimiter,
+    }
+    return [
+        prefix["Prefix"]
+        for page in paginator.paginate(**params)
+        for prefix in page.get("CommonPrefixes", [])
+    ]
+
+
+# List bucket objects, fanning out over the common prefixes in parallel
+def iter_bucket_objects_parallel(
+    bucket_name, key_prefix=None, delimiter="/", workers=8, client=None
+):
+    client = client or get_client("s3")
+    # One delimited listing yields the objects sitting directly under
+    # key_prefix and collects the common prefixes to fan out over
+    paginator = client.get_paginator("list_objects_v2")
+    prefixes = []
+    for page in paginator.paginate(
+        Bucket=bucket_name, Prefix=key_prefix or "", Delimiter=delimiter
+    ):
+        yield from page.get("Contents", [])
+        prefixes.extend(prefix["Prefix"] for prefix in page.get("CommonPrefixes", []))
+    if not prefixes:
+        return
+
+    # Workers hand over pages through a bounded queue so memory stays flat
+    pages = queue.Queue(maxsize=workers * 4)
+    done = object()
+    stop = threading.Event()
+
+    def lister(prefix):
+        try:
+            for obj in iter_bucket_objects(bucket_name, prefix, client=client):
+                if stop.is_set():
+                    return
+                pages.put(obj)
+        finally:
+            pages.put(done)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(lister, prefix) for prefix in prefixes]
+        try:
+            remaining = len(futures)
+            while remaining:
+                obj = pages.get()
+                if obj is done:
+                    remaining -= 1
+                else:
+                    yield obj
+        finally:
+            stop.set()
+            while any(not future.done() for future in futures):
+                try:
+                    pages.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        for future in futures:
+            future.result()
+
+
+# Key index: a local SQLite copy of a bucket listing for repeated queries
+def _open_key_index(db_path):
+    db = sqlite3.connect(db_path)
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS objects ("
+        "bucket TEXT, key TEXT, size INTEGER, etag TEXT, "
+        "last_modified REAL, storage_class TEXT, "
+        "PRIMARY KEY (bucket, key))"
+    )
+    return db
+
+
+# Save a bucket listing (or a part of it) into the local key index
+def index_bucket_objects(
+    bucket_name, db_path, key_prefix=None, parallel=False, client=None
+):
+    if parallel:
+        objects = iter_bucket_objects_parallel(
+            bucket_name, key_prefix, client=client
+        )
+    else:
+        objects = iter_bucket_objects(bucket_name, key_prefix, client=client)
+    rows = (
+        (
+            bucket_name,
+            obj["Key"],
+            obj["Size"],
+            obj["ETag"].strip('"'),
+            obj["LastModified"].timestamp(),
+            obj.get("StorageClass"),
+        )
+        for obj in objects
+    )
+    db = _open_key_index(db_path)
+    count = 0
+    with db:
+        # Replace whatever was indexed for this prefix before
+        db.execute(
+            "DELETE FROM objects WHERE bucket = ? AND substr(key, 1, ?) = ?",
+            (bucket_name, len(key_prefix or ""), key_prefix or ""),
+        )
+        while True:
+            batch = list(itertools.islice(rows, 1000))
+            if not batch:
+                break
+            db.executemany(
+                "INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?)", batch
+            )
+            count += len(batch)
+    db.close()
+    log.info(f"Indexed {count} objects of {bucket_name} into {db_path}")
+    return count
+
+
+# Query the local key index by prefix, size and age (in days)
+def query_key_index(
+    db_path,
+    bucket_name,
+    key_prefix=None,
+    min_size=None,
+    max_size=None,
+    older_than=None,
+):
+    sql = "SELECT key, size, etag, last_modified, storage_class FROM objects"
+    sql += " WHERE bucket = ?"
+    params = [bucket_name]
+    if key_prefix:
+        sql += " AND key >= ? AND key < ?"
+        params += [key_prefix, f"{key_prefix}\U0010ffff"]
+    if min_size is not None:
+        sql += " AND size >= ?"
+        params.append(min_size)
+    if max_size is not None:
+        sql += " AND size <= ?"
+        params.append(max_size)
+    if older_than is not None:
+        sql += " AND last_modified < ?"
+        params.append(time.time() - older_than * 86400)
+    db = _open_key_index(db_path)
+    try:
+        yield from db.execute(f"{sql} ORDER BY key", params)
+    finally:
+        db.close()
+
+
+def _head_bucket(client, name):
+    try:
+        return client.head_bucket(Bucket=name)
+    except ClientError as err:
+        code = err.response.get("Error", {}).get("Code")
+        if code in ("404", "NoSuchBucket"):
+            return
+        raise
+
+
+# Check a bucket with HeadBucket, caching the result for BUCKET_CACHE_TTL
+def head_bucket(name, client=None):
+    entry = _cached_bucket(name)
+    if entry:
+        return entry
+    res = _head_bucket(client or get_client("s3"), name)
+    if res is None:
+        return
+    headers = res.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+    return _cache_bucket(name, region=headers.get("x-amz-bucket-region"))
+
+
+# Get the region of a bucket
+def get_bucket_region(name, client=None):
+    entry = head_bucket(name, client=client)
+    return entry and entry["region"]
+
+
+# Get the versioning status of a bucket
+def get_bucket_versioning(name, client=None):
+    entry = head_bucket(name, client=client)
+    if not entry:
+        return
+    if "versioning" not in entry:
+        client = client or get_client("s3")
+        res = client.get_bucket_versioning(Bucket=name)
+        entry = _cache_bucket(name, versioning=res.get("Status"))
+    return entry["versioning"]
+
+
 # Get a bucket
-def get_bucket(name, create=False, region=None):
-    client = boto3.resource("s3")
-    bucket = client.Bucket(name=name)
-    if bucket.creation_date:
-        log.info(str(bucket) + ":" + str(bucket.creation_date))
+def get_bucket(name, create=False, region=None, resource=None):
+    client = resource or get_resource("s3")
+    entry = head_bucket(name, client=client.meta.client)
+    if entry:
+        bucket = client.Bucket(name=name)
+        log.info(f"{bucket}:{entry['region']}")
         return bucket
     else:
         if create:
+            # Created through a client in the target region
             create_bucket(name, region=region)
-            return get_bucket(name)
+            return get_bucket(name, resource=resource)
         else:
             log.warning(f"Bucket {name} does not exist!")
             return
 
 
-# Create a temporary text file in a bucket
-def create_tempfile(file_name=None, content=None, size=300):
-    filename = f"{file_name or uuid.uuid4().hex}.txt"
-    with open(filename, "w") as f:
-        f.write(f'{(content or "0") * size}')
+SIZE_UNITS = {"": 1, "k": 1024, "m": MB, "g": 1024 * MB, "t": 1024**2 * MB}
+
+
+# Parse a size such as 300, "64KB", "10M" or "2GiB" into bytes
+def parse_size(size):
+    if isinstance(size, int):
+        return size
+    pattern = r"\s*(\d+(?:\.\d+)?)\s*([kmgt]?)(?:i?b)?\s*"
+    match = re.fullmatch(pattern, str(size), re.I)
+    if not match:
+        raise ValueError(f"Invalid size: {size}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+
+
+# Generate a payload of the given size in fixed-size chunks
+# mode: text (repeated content), zero (null bytes) or random
+def iter_payload(size, content=None, mode="text", chunk_size=MB):
+    size = parse_size(size)
+    if mode == "text":
+        pattern = (content or "0").encode()
+        block = pattern * max(1, chunk_size // len(pattern))
+    elif mode == "zero":
+        block = bytes(chunk_size)
+    elif mode == "random":
+        block = None
+    else:
+        raise ValueError(f"Invalid payload mode: {mode}")
+    while size > 0:
+        n = min(size, len(block) if block else chunk_size)
+        yield block[:n] if block else os.urandom(n)
+        size -= n
+
+
+# Create a temporary file (written in chunks, so memory stays flat)
+def create_tempfile(file_name=None, content=None, size=300, mode="text"):
+    ext = "txt" if mode == "text" else "bin"
+    filename = f"{file_name or uuid.uuid4().hex}.{ext}"
+    with open(filename, "wb") as f:
+        for chunk in iter_payload(size, content, mode):
+            f.write(chunk)
     return filename
 
 
+# Create many temporary files in parallel
+def create_tempfiles(
+    count, file_prefix=None, content=None, size=300, mode="text", workers=8
+):
+    names = (
+        f"{file_prefix}{i}" if file_prefix else None for i in range(count)
+    )
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(
+            pool.map(
+                lambda name: create_tempfile(name, content, size, mode), names
+            )
+        )
+
+
+# Build a TransferConfig for multipart transfers (sizes in MB)
+def get_transfer_config(threshold=8, chunk_size=8, concurrency=10):
+    return TransferConfig(
+        multipart_threshold=int(threshold * MB),
+        multipart_chunksize=int(chunk_size * MB),
+        max_concurrency=concurrency,
+    )
+
+
+def _throughput(nbytes, elapsed):
+    rate = nbytes / MB / (elapsed or 1e-9)
+    return f"{nbytes / MB:.2f} MB in {elapsed:.2f}s ({rate:.2f} MB/s)"
+
+
+# Upload a single file through a (shared) client and report its throughput
+def _upload_file(client, bucket_name, file_path, key, config=None):
+    started = time.monotonic()
+    client.upload_file(
+        Filename=str(file_path), Bucket=bucket_name, Key=key, Config=config
+    )
+    size = os.path.getsize(file_path)
+    elapsed = time.monotonic() - started
+    log.info(f"{file_path} -> {key}: {_throughput(size, elapsed)}")
+    return size
+
+
 # Create bucket object
-def create_bucket_object(bucket_name, file_path, key_prefix=None):
-    bucket = get_bucket(bucket_name)
+def create_bucket_object(
+    bucket_name, file_path, key_prefix=None, resource=None, config=None
+):
+    bucket = get_bucket(bucket_name, resource=resource)
     dest = f'{key_prefix or ""}{file_path}'
     bucket_object = bucket.Object(dest)
-    bucket_object.upload_file(Filename=file_path)
+    _upload_file(bucket.meta.client, bucket_name, file_path, dest, config)
     return bucket_object
 
 
-#  Get Bucket Object(Download)
-def get_bucket_object(bucket_name, object_key, dest=None, version_id=None):
-    bucket = get_bucket(bucket_name)
-    params = {"key": object_key}
+# Create bucket objects from a directory or glob pattern (concurrent upload)
+def create_bucket_objects(
+    bucket_name, pattern, key_prefix=None, workers=16, config=None, client=None
+):
+    client = client or get_client("s3")
+    if not head_bucket(bucket_name, client=client):
+        log.warning(f"Bucket {bucket_name} does not exist!")
+        return []
+
+    root = Path(pattern)
+    key_prefix = key_prefix or ""
+    if root.is_dir():
+        files = (
+            (path, f"{key_prefix}{path.relative_to(root).as_posix()}")
+            for path in root.rglob("*")
+            if path.is_file()
+        )
+    else:
+        files = (
+            (path, f"{key_prefix}{Path(path).as_posix()}")
+            for path in glob.iglob(pattern, recursive=True)
+            if os.path.isfile(path)
+        )
+
+    uploaded = []
+    total = 0
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_upload_file, client, bucket_name, path, key, config): key
+            for path, key in files
+        }
+        for future in as_completed(futures):
+            try:
+                total += future.result()
+                uploaded.append(futures[future])
+            except (ClientError, OSError) as err:
+                log.error(f"Failed to upload {futures[future]}: {err}")
+
+    log.info(
+        f"Uploaded {len(uploaded)}/{len(futures)} files to {bucket_name}: "
+        f"{_throughput(total, time.monotonic() - started)}"
+    )
+    return uploaded
+
+
+# Check a downloaded object against its ETag (MD5 or multipart MD5-of-MD5s)
+def _verify_etag(client, params, data, etag):
+    etag = etag.strip('"')
+    if "-" not in etag:
+        return hashlib.md5(data, usedforsecurity=False).hexdigest() == etag
+    part_size = client.head_object(PartNumber=1, **params)["ContentLength"]
+    digests = b"".join(
+        hashlib.md5(data[pos:pos + part_size], usedforsecurity=False).digest()
+        for pos in range(0, len(data), part_size)
+    )
+    parts = -(-len(data) // part_size)
+    return (
+        f"{hashlib.md5(digests, usedforsecurity=False).hexdigest()}-{parts}"
+        == etag
+    )
+
+
+# Download an object in concurrent byte ranges into a memory-mapped file
+def download_object(
+    bucket_name,
+    object_key,
+    file_path,
+    version_id=None,
+    chunk_size=8,
+    workers=8,
+    verify=True,
+    client=None,
+):
+    client = client or get_client("s3")
+    params = {"Bucket": bucket_name, "Key": object_key}
     if version_id:
         params["VersionId"] = version_id
-    bucket_object = bucket.Object(**params)
+    head = client.head_object(**params)
+    size = head["ContentLength"]
+    # Pin every range to the version we just inspected
+    params["IfMatch"] = head["ETag"]
+
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    # Ranges land in a temporary file, renamed once complete and verified
+    part_path = file_path.with_name(f".{file_path.name}.part")
+    step = int(chunk_size * MB)
+    started = time.monotonic()
+    valid = True
+    try:
+        with open(part_path, "wb+") as f:
+            f.truncate(size)
+            if size:
+                with mmap.mmap(f.fileno(), size) as mm:
+
+                    def fetch(start):
+                        end = min(start + step, size) - 1
+                        body = client.get_object(
+                            Range=f"bytes={start}-{end}", **params
+                        )
+                        pos = start
+                        for chunk in body["Body"].iter_chunks(MB):
+                            mm[pos:pos + len(chunk)] = chunk
+                            pos += len(chunk)
+
+                    with ThreadPoolExecutor(max_workers=workers) as pool:
+                        list(pool.map(fetch, range(0, size, step)))
+                    mm.flush()
+
+                    # SSE-KMS ETags are not an MD5 of the content
+                    if verify and head.get("ServerSideEncryption") != "aws:kms":
+                        params.pop("IfMatch")
+                        valid = _verify_etag(client, params, mm, head["ETag"])
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+
+    if not valid:
+        log.error(f"ETag mismatch for {object_key}, discarding {file_path}")
+        part_path.unlink()
+        return
+    os.replace(part_path, file_path)
+
+    elapsed = time.monotonic() - started
+    log.info(f"{object_key} -> {file_path}: {_throughput(size, elapsed)}")
+    return file_path
+
+
+#  Get Bucket Object(Download)
+def get_bucket_object(
+    bucket_name,
+    object_key,
+    dest=None,
+    version_id=None,
+    resource=None,
+    workers=None,
+    chunk_size=8,
+):
+    bucket = get_bucket(bucket_name, resource=resource)
+    bucket_object = bucket.Object(key=object_key)
     dest = Path(f'{dest or ""}')
     file_path = dest.joinpath(PosixPath(object_key).name)
-    bucket_object.download_file(f"{file_path}")
+    if workers:
+        file_path = download_object(
+            bucket_name,
+            object_key,
+            file_path,
+            version_id=version_id,
+            chunk_size=chunk_size,
+            workers=workers,
+            client=bucket.meta.client,
+        )
+    else:
+        extra = {"VersionId": version_id} if version_id else None
+        bucket_object.download_file(f"{file_path}", ExtraArgs=extra)
     return bucket_object, file_path
 
 
+# Local path of an object under root, refusing keys such as "../x" or
+# "/etc/x" that would land outside it
+def _local_path(root, rel):
+    root = Path(root).resolve()
+    path = root.joinpath(rel).resolve()
+    if root not in path.parents:
+        raise ValueError(f"{rel} resolves outside {root}")
+    return path
+
+
+# Treat a key prefix as a directory: "" or a prefix ending with "/"
+def _dir_prefix(key_prefix):
+    key_prefix = key_prefix or ""
+    if key_prefix and not key_prefix.endswith("/"):
+        key_prefix += "/"
+    return key_prefix
+
+
+# Get Bucket Objects under a key prefix (Bulk download)
+def get_bucket_objects(
+    bucket_name,
+    key_prefix=None,
+    dest=None,
+    workers=8,
+    range_workers=4,
+    chunk_size=8,
+    client=None,
+):
+    client = client or get_client("s3")
+    key_prefix = _dir_prefix(key_prefix)
+    dest = Path(f'{dest or ""}')
+    keys = (
+        obj["Key"]
+        for obj in iter_bucket_objects(bucket_name, key_prefix, client=client)
+        if not obj["Key"].endswith("/")
+    )
+
+    downloaded = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for key in keys:
+            try:
+                file_path = _local_path(dest, key[len(key_prefix):])
+            except ValueError as err:
+                log.error(f"Skipping {key}: {err}")
+                continue
+            future = pool.submit(
+                download_object,
+                bucket_name,
+                key,
+                file_path,
+                chunk_size=chunk_size,
+                workers=range_workers,
+                client=client,
+            )
+            futures[future] = key
+        for future in as_completed(futures):
+            try:
+                file_path = future.result()
+            except (ClientError, OSError) as err:
+                log.error(f"Failed to download {futures[future]}: {err}")
+                continue
+            if file_path:
+                downloaded.append(file_path)
+
+    log.info(f"Downloaded {len(downloaded)}/{len(futures)} objects to {dest}")
+    return downloaded
+
+
+# Sync manifest: relative path -> {"size", "mtime", "etag"} as of the last sync
+SYNC_MANIFEST = ".s3sync-manifest.json"
+
+
+def _load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_manifest(path, manifest):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+# Walk a directory yielding (relative path, size, mtime) for every file
+def _scan_local(root, exclude=()):
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            rel = Path(path).relative_to(root).as_posix()
+            if rel in exclude:
+                continue
+            st = os.stat(path)
+            yield rel, st.st_size, st.st_mtime_ns
+
+
+# List a remote prefix as relative key -> (size, etag, last modified),
+# leaving out keys that would be synced outside root, or to a path that
+# _scan_local reports under another name ("a//b", "a/./b")
+def _scan_remote(client, bucket_name, key_prefix, root):
+    remote = {}
+    root = Path(root).resolve()
+    for obj in iter_bucket_objects(bucket_name, key_prefix, client=client):
+        if obj["Key"].endswith("/"):
+            continue
+        rel = obj["Key"][len(key_prefix):]
+        try:
+            path = _local_path(root, rel)
+        except ValueError as err:
+            log.warning(f"Skipping {obj['Key']}: {err}")
+            continue
+        if path.relative_to(root).as_posix() != rel:
+            log.warning(f"Skipping {obj['Key']}: not a plain relative path")
+            continue
+        remote[rel] = (
+            obj["Size"],
+            obj["ETag"].strip('"'),
+            obj["LastModified"].timestamp(),
+        )
+    return remote
+
+
+def _file_md5(path):
+    md5 = hashlib.md5(usedforsecurity=False)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(MB), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _sync_upload(client, bucket_name, path, key):
+    _upload_file(client, bucket_name, path, key)
+    return client.head_object(Bucket=bucket_name, Key=key)["ETag"].strip('"')
+
+
+def _sync_download(client, bucket_name, key, path, etag):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    client.download_file(Bucket=bucket_name, Key=key, Filename=str(path))
+    return etag
+
+
+# Sync a local directory with a bucket prefix (direction: up, down or both)
+def sync_bucket_prefix(
+    bucket_name,
+    local_dir,
+    key_prefix=None,
+    direction="both",
+    workers=16,
+    client=None,
+):
+    client = client or get_client("s3")
+    key_prefix = _dir_prefix(key_prefix)
+    root = Path(local_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    manifest_path = root.joinpath(SYNC_MANIFEST)
+    manifest = _load_manifest(manifest_path)
+    started = time.monotonic()
+
+    local = {
+        rel: (size, mtime)
+        for rel, size, mtime in _scan_local(
+            root, exclude={SYNC_MANIFEST, f"{SYNC_MANIFEST}.tmp"}
+        )
+    }
+    remote = _scan_remote(client, bucket_name, key_prefix, root)
+
+    uploads, downloads = [], []
+    for rel in local.keys() | remote.keys():
+        entry = manifest.get(rel)
+        size, mtime = local.get(rel, (None, None))
+        r_size, etag, r_mtime = remote.get(rel, (None, None, None))
+        # A side is stale if it differs from the manifest or is missing
+        local_changed = size is not None and (
+            not entry
+            or etag is None
+            or [size, mtime] != [entry["size"], entry["mtime"]]
+        )
+        remote_changed = etag is not None and (
+            not entry or size is None or etag != entry["etag"]
+        )
+        # First sync of a file already present on both sides
+        if local_changed and remote_changed and not entry and size == r_size:
+            if "-" not in etag and _file_md5(root.joinpath(rel)) == etag:
+                manifest[rel] = {"size": size, "mtime": mtime, "etag": etag}
+                continue
+        if local_changed and remote_changed and direction == "both":
+            if mtime / 1e9 >= r_mtime:
+                remote_changed = False
+            else:
+                local_changed = False
+        if local_changed and direction in ("up", "both"):
+            uploads.append(rel)
+        elif remote_changed and direction in ("down", "both"):
+            downloads.append(rel)
+
+    transferred = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for rel in uploads:
+            future = pool.submit(
+                _sync_upload,
+                client,
+                bucket_name,
+                root.joinpath(rel),
+                f"{key_prefix}{rel}",
+            )
+            futures[future] = rel
+        for rel in downloads:
+            future = pool.submit(
+                _sync_download,
+                client,
+                bucket_name,
+                f"{key_prefix}{rel}",
+                root.joinpath(rel),
+                remote[rel][1],
+            )
+            futures[future] = rel
+        for future in as_completed(futures):
+            rel = futures[future]
+            try:
+                etag = future.result()
+            except (ClientError, OSError) as err:
+                log.error(f"Failed to sync {rel}: {err}")
+                continue
+            st = os.stat(root.joinpath(rel))
+            manifest[rel] = {
+                "size": st.st_size,
+                "mtime": st.st_mtime_ns,
+                "etag": etag,
+            }
+            transferred += 1
+
+    _save_manifest(manifest_path, manifest)
+    log.info(
+        f"Synced {root} with s3://{bucket_name}/{key_prefix}: "
+        f"{len(uploads)} up, {len(downloads)} down, {transferred} transferred "
+        f"in {time.monotonic() - started:.2f}s"
+    )
+    return uploads, downloads
+
+
 # Create Bucket object version(Enable bucket versioning)
-def enable_bucket_versioning(bucket_name):
-    bucket = get_bucket(bucket_name)
+def enable_bucket_versioning(bucket_name, resource=None):
+    bucket = get_bucket(bucket_name, resource=resource)
     versioned = bucket.Versioning()
     versioned.enable()
-    return versioned.status
+    _cache_bucket(bucket_name, versioning="Enabled")
+    return "Enabled"
 
 
-# Delete Bucket Objects including all of its versions
-def delete_bucket_objects(bucket_name, key_prefix=None):
-    bucket = get_bucket(bucket_name)
-    objects = bucket.object_versions
-    if key_prefix:
-        objects = objects.filter(Prefix=key_prefix)
+# Split the versions (and delete markers) of a bucket into delete batches
+def _iter_version_batches(client, bucket_name, key_prefix=None, batch_size=1000):
+    pages = client.get_paginator("list_object_versions").paginate(
+        Bucket=bucket_name,
+        Prefix=key_prefix or "",
+        PaginationConfig={"PageSize": batch_size},
+    )
+    batch = []
+    for page in pages:
+        for obj in page.get("Versions", []) + page.get("DeleteMarkers", []):
+            batch.append({"Key": obj["Key"], "VersionId": obj["VersionId"]})
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+# Delete one batch, retrying the keys reported back in Errors
+def _delete_version_batch(client, bucket_name, targets, max_retries=3):
+    deleted = 0
+    for attempt in range(max_retries + 1):
+        res = client.delete_objects(
+            Bucket=bucket_name,
+            Delete={
+                "Objects": targets,
+                "Quiet": True,
+            },
+        )
+        errors = res.get("Errors", [])
+        deleted += len(targets) - len(errors)
+        if not errors:
+            break
+        targets = [
+            {"Key": err["Key"], "VersionId": err.get("VersionId")}
+            for err in errors
+        ]
+        if attempt < max_retries:
+            time.sleep(0.2 * 2**attempt)
     else:
-        objects = objects.iterator()
-    targets = []  # This should be a max of 1000
-    for obj in objects:
-        targets.append(
-            {
-                "Key": obj.object_key,
-                "VersionId": obj.version_id,
-            }
+        for err in errors:
+            log.error(f"Failed to delete {err['Key']}: {err.get('Message')}")
+    return deleted
+
+
+# Delete Bucket Objects including all of its versions
+def delete_bucket_objects(
+    bucket_name,
+    key_prefix=None,
+    resource=None,
+    workers=8,
+    max_retries=3,
+    client=None,
+):
+    if client is None:
+        bucket = get_bucket(bucket_name, resource=resource)
+        if not bucket:
+            return 0
+        client = bucket.meta.client
+    deleted = 0
+    started = time.monotonic()
+
+    def report(future):
+        nonlocal deleted
+        deleted += future.result()
+        elapsed = time.monotonic() - started
+        log.info(
+            f"{bucket_name}: deleted {deleted} versions "
+            f"({deleted / elapsed if elapsed else 0:.0f}/s)"
         )
-    bucket.delete_objects(
-        Delete={
-            "Objects": targets,
-            "Quiet": True,
-        }
-    )
 
-    return len(targets)
+    # At most 2 batches per worker are held in memory at any time
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for targets in _iter_version_batches(client, bucket_name, key_prefix):
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report(future)
+            pending.add(
+                pool.submit(
+                    _delete_version_batch,
+                    client,
+                    bucket_name,
+                    targets,
+                    max_retries,
+                )
+            )
+        for future in as_completed(pending):
+            report(future)
+
+    return deleted
 
 
 # Delete buckets
-def delete_buckets(name=None):
+def delete_buckets(name=None, resource=None):
     count = 0
     if name:
-        bucket = get_bucket(name)
+        bucket = get_bucket(name, resource=resource)
         if bucket:
             bucket.delete()
+            invalidate_bucket(name)
             bucket.wait_until_not_exists()
             count += 1
         else:
             count = 0
-            client = boto3.resource("s3")
+            client = resource or get_resource("s3")
             for bucket in client.buckets.iterator():
                 try:
                     bucket.delete()
+                    invalidate_bucket(bucket.name)
                     bucket.wait_until_not_exists()
                     count += 1
                 except ClientError as err:
@@ -149,6 +957,72 @@ def delete_buckets(name=None):
     return count
 
 
+# Wait for many buckets to disappear, polling them together in rounds
+def _wait_until_buckets_gone(client, names, pool, delay=5, max_attempts=20):
+    pending = list(names)
+    for attempt in range(max_attempts):
+        exists = pool.map(lambda name: _head_bucket(client, name), pending)
+        pending = [name for name, res in zip(pending, exists) if res]
+        if not pending:
+            break
+        time.sleep(delay)
+    for name in pending:
+        log.warning(f"Bucket {name} still exists after {max_attempts} checks")
+    return set(names).difference(pending)
+
+
+# Empty and delete a single bucket without waiting for it to disappear.
+# Returns None if the bucket is already gone.
+def _teardown_bucket(client, name, workers):
+    if _head_bucket(client, name) is None:
+        log.warning(f"Bucket {name} does not exist!")
+        invalidate_bucket(name)
+        return
+    delete_bucket_objects(name, workers=workers, client=client)
+    client.delete_bucket(Bucket=name)
+    invalidate_bucket(name)
+    return name
+
+
+# Empty and delete many buckets concurrently (selected by names and/or prefix)
+def teardown_buckets(
+    names=None, prefix=None, dry_run=False, workers=8, client=None
+):
+    client = client or get_client("s3")
+    selected = set(names or [])
+    if prefix:
+        selected.update(
+            bucket["Name"]
+            for bucket in client.list_buckets().get("Buckets", [])
+            if bucket["Name"].startswith(prefix)
+        )
+    plan = sorted(selected)
+    if dry_run:
+        for name in plan:
+            log.info(f"Would empty and delete bucket {name}")
+        log.info(f"Dry run: {len(plan)} buckets would be deleted")
+        return plan
+
+    deleted = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_teardown_bucket, client, name, workers): name
+            for name in plan
+        }
+        for future in as_completed(futures):
+            try:
+                name = future.result()
+            except ClientError as err:
+                log.warning(f"Bucket {futures[future]}: {err}")
+                continue
+            if name:
+                deleted.append(name)
+        gone = _wait_until_buckets_gone(client, deleted, pool)
+
+    log.info(f"Deleted {len(gone)}/{len(plan)} buckets")
+    return sorted(gone)
+
+
 def main(args_):
     if hasattr(args_, "func"):
         # action =
@@ -156,16 +1030,67 @@ def main(args_):
             args_.func(args_.name, args_.region)
         elif args_.func.__name__ == "list_buckets":
             args_.func()
+        elif args_.func.__name__ == "iter_bucket_objects":
+            if args_.index:
+                index_bucket_objects(
+                    args_.bucket_name, args_.index, args_.key_prefix,
+                    args_.parallel,
+                )
+            elif args_.parallel:
+                for obj in iter_bucket_objects_parallel(
+                    args_.bucket_name, args_.key_prefix,
+                    args_.delimiter or "/",
+                ):
+                    print(obj["Key"])
+            else:
+                for obj in iter_bucket_objects(
+                    args_.bucket_name, args_.key_prefix,
+                    args_.delimiter, args_.start_after,
+                ):
+                    print(obj["Key"])
+        elif args_.func.__name__ == "query_key_index":
+            for row in args_.func(
+                args_.db_path, args_.bucket_name, args_.key_prefix,
+                args_.min_size, args_.max_size, args_.older_than,
+            ):
+                print(*row, sep="\t")
         elif args_.func.__name__ == "get_bucket":
             args_.func(args_.name, args_.create, args_.region)
         elif args_.func.__name__ == "create_tempfile":
-            args_.func(args_.file_name, args_.content, args_.size)
+            if args_.count:
+                create_tempfiles(
+                    args_.count, args_.file_name, args_.content,
+                    args_.size, args_.mode, args_.workers,
+                )
+            else:
+                args_.func(
+                    args_.file_name, args_.content, args_.size, args_.mode
+                )
         elif args_.func.__name__ == "create_bucket_object":
             args_.func(args_.bucket_name, args_.file_path, args_.key_prefix)
+        elif args_.func.__name__ == "create_bucket_objects":
+            args_.func(
+                args_.bucket_name, args_.pattern, args_.key_prefix,
+                args_.workers,
+                get_transfer_config(
+                    args_.threshold, args_.chunk_size, args_.concurrency
+                ),
+            )
         elif args_.func.__name__ == "get_bucket_object":
             args_.func(
                 args_.bucket_name, args_.object_key,
-                args_.dest, args_.version_id
+                args_.dest, args_.version_id,
+                workers=args_.workers, chunk_size=args_.chunk_size,
+            )
+        elif args_.func.__name__ == "get_bucket_objects":
+            args_.func(
+                args_.bucket_name, args_.key_prefix, args_.dest,
+                args_.workers, args_.range_workers, args_.chunk_size,
+            )
+        elif args_.func.__name__ == "sync_bucket_prefix":
+            args_.func(
+                args_.bucket_name, args_.local_dir, args_.key_prefix,
+                args_.direction, args_.workers,
             )
         elif args_.func.__name__ == "enable_bucket_versioning":
             args_.func(args_.bucket_name)
@@ -173,6 +1098,10 @@ def main(args_):
             args_.func(args_.bucket_name, args_.key_prefix)
         elif args_.func.__name__ == "delete_buckets":
             args_.func(args_.name)
+        elif args_.func.__name__ == "teardown_buckets":
+            args_.func(
+                args_.names, args_.prefix, args_.dry_run, args_.workers
+            )
         else:
             log.error("Invalid/Missing command.")
             sys.exit(1)
@@ -208,6 +1137,63 @@ if __name__ == "__main__":
     )
     sp_list_buckets.set_defaults(func=list_buckets)
 
+    # _______________List bucket objects subcommand________________
+    sp_list_objects = sp.add_parser(
+        "list_bucket_objects",
+        help="List the objects of an S3 bucket",
+    )
+    sp_list_objects.add_argument(
+        "bucket_name",
+        help="Name of the bucket",
+    )
+    sp_list_objects.add_argument(
+        "key_prefix", help="Key prefix: None (default)",
+        nargs="?", default=None
+    )
+    sp_list_objects.add_argument(
+        "--delimiter", help="Delimiter: None (default)", default=None
+    )
+    sp_list_objects.add_argument(
+        "--start-after", help="Start listing after this key", default=None
+    )
+    sp_list_objects.add_argument(
+        "--parallel", help="Fan out over common prefixes",
+        action="store_true"
+    )
+    sp_list_objects.add_argument(
+        "--index", help="Save the listing into this SQLite key index",
+        default=None
+    )
+    sp_list_objects.set_defaults(func=iter_bucket_objects)
+
+    # _______________Query key index subcommand________________
+    sp_query_index = sp.add_parser(
+        "query_key_index",
+        help="Query a local SQLite key index",
+    )
+    sp_query_index.add_argument(
+        "db_path",
+        help="Path of the key index",
+    )
+    sp_query_index.add_argument(
+        "bucket_name",
+        help="Name of the bucket",
+    )
+    sp_query_index.add_argument(
+        "key_prefix", help="Key prefix: None (default)",
+        nargs="?", default=None
+    )
+    sp_query_index.add_argument(
+        "--min-size", help="Minimum size in bytes", type=int, default=None
+    )
+    sp_query_index.add_argument(
+        "--max-size", help="Maximum size in bytes", type=int, default=None
+    )
+    sp_query_index.add_argument(
+        "--older-than", help="Minimum age in days", type=float, default=None
+    )
+    sp_query_index.set_defaults(func=query_key_index)
+
     # _______________Get bucket subcommand_______________
     sp_get_bucket = sp.add_parser(
         "get_bucket",
@@ -228,7 +1214,7 @@ if __name__ == "__main__":
     # _______________Create temporary file subcommand_______________
     sp_create_temp = sp.add_parser(
         "create_tempfile",
-        help="Create a temporary text file",
+        help="Create a temporary file",
     )
     sp_create_temp.add_argument(
         "file_name", help="Filename: None (default)", nargs="?", default=None
@@ -237,7 +1223,20 @@ if __name__ == "__main__":
         "content", help="Content: None (default)", nargs="?", default=None
     )
     sp_create_temp.add_argument(
-        "size", help="File size: 300 (default", nargs="?", default=None
+        "size", help="File size, e.g. 64KB or 2GB: 300 (default)",
+        nargs="?", default=300
+    )
+    sp_create_temp.add_argument(
+        "--mode", help="Payload: text (default)",
+        choices=("text", "zero", "random"), default="text"
+    )
+    sp_create_temp.add_argument(
+        "--count", help="Number of files, file_name used as prefix",
+        type=int, default=None
+    )
+    sp_create_temp.add_argument(
+        "--workers", help="Files written at once: 8 (default)",
+        type=int, default=8
     )
     sp_create_temp.set_defaults(func=create_tempfile)
 
@@ -251,7 +1250,7 @@ if __name__ == "__main__":
         help="Bucket name for the created object",
     )
     sp_create_bucket_object.add_argument(
-        "fila_path",
+        "file_path",
         help="Path of the file to be uploaded to the bucket",
     )
     sp_create_bucket_object.add_argument(
@@ -260,6 +1259,41 @@ if __name__ == "__main__":
     )
     sp_create_bucket_object.set_defaults(func=create_bucket_object)
 
+    # _______________Create bucket objects subcommand_______________
+    sp_create_bucket_objects = sp.add_parser(
+        "create_bucket_objects",
+        help="Upload a directory or glob of files concurrently",
+    )
+    sp_create_bucket_objects.add_argument(
+        "bucket_name",
+        help="Bucket name for the created objects",
+    )
+    sp_create_bucket_objects.add_argument(
+        "pattern",
+        help="Directory or glob pattern of the files to be uploaded",
+    )
+    sp_create_bucket_objects.add_argument(
+        "key_prefix", help="Key prefix: None (default)",
+        nargs="?", default=None
+    )
+    sp_create_bucket_objects.add_argument(
+        "--workers", help="Files uploaded at once: 16 (default)",
+        type=int, default=16
+    )
+    sp_create_bucket_objects.add_argument(
+        "--threshold", help="Multipart threshold in MB: 8 (default)",
+        type=float, default=8
+    )
+    sp_create_bucket_objects.add_argument(
+        "--chunk-size", help="Multipart chunk size in MB: 8 (default)",
+        type=float, default=8
+    )
+    sp_create_bucket_objects.add_argument(
+        "--concurrency", help="Threads per multipart file: 10 (default)",
+        type=int, default=10
+    )
+    sp_create_bucket_objects.set_defaults(func=create_bucket_objects)
+
     # _______________Get bucket object subcommand_______________
     sp_get_bucket_object = sp.add_parser(
         "get_bucket_object",
@@ -280,8 +1314,73 @@ if __name__ == "__main__":
         "version_id", help="Version ID: None (default)",
         nargs="?", default=None
     )
+    sp_get_bucket_object.add_argument(
+        "--workers", help="Concurrent ranged download: None (default)",
+        type=int, default=None
+    )
+    sp_get_bucket_object.add_argument(
+        "--chunk-size", help="Range size in MB: 8 (default)",
+        type=float, default=8
+    )
     sp_get_bucket_object.set_defaults(func=get_bucket_object)
 
+    # _______________Get bucket objects subcommand_______________
+    sp_get_bucket_objects = sp.add_parser(
+        "get_bucket_objects",
+        help="Download every object under a key prefix.",
+    )
+    sp_get_bucket_objects.add_argument(
+        "bucket_name",
+        help="The target bucket",
+    )
+    sp_get_bucket_objects.add_argument(
+        "key_prefix", help="Key prefix: None (default)",
+        nargs="?", default=None
+    )
+    sp_get_bucket_objects.add_argument(
+        "dest", help="Path for saving objects", nargs="?", default=None
+    )
+    sp_get_bucket_objects.add_argument(
+        "--workers", help="Objects downloaded at once: 8 (default)",
+        type=int, default=8
+    )
+    sp_get_bucket_objects.add_argument(
+        "--range-workers", help="Ranges fetched at once per object: 4 (default)",
+        type=int, default=4
+    )
+    sp_get_bucket_objects.add_argument(
+        "--chunk-size", help="Range size in MB: 8 (default)",
+        type=float, default=8
+    )
+    sp_get_bucket_objects.set_defaults(func=get_bucket_objects)
+
+    # _______________Sync bucket prefix subcommand_______________
+    sp_sync = sp.add_parser(
+        "sync_bucket_prefix",
+        help="Sync a local directory with a bucket prefix",
+    )
+    sp_sync.add_argument(
+        "bucket_name",
+        help="The target bucket",
+    )
+    sp_sync.add_argument(
+        "local_dir",
+        help="Local directory to be synced",
+    )
+    sp_sync.add_argument(
+        "key_prefix", help="Key prefix: None (default)",
+        nargs="?", default=None
+    )
+    sp_sync.add_argument(
+        "--direction", help="Sync direction: both (default)",
+        choices=("up", "down", "both"), default="both"
+    )
+    sp_sync.add_argument(
+        "--workers", help="Files transferred at once: 16 (default)",
+        type=int, default=16
+    )
+    sp_sync.set_defaults(func=sync_bucket_prefix)
+
     # _______________Enable bucket object versioning subcommand_______________
     sp_enable_bucket_versioning = sp.add_parser(
         "enable_bucket_versioning",
@@ -317,6 +1416,27 @@ if __name__ == "__main__":
     )
     sp_delete_buckets.set_defaults(func=delete_buckets)
 
+    sp_teardown_buckets = sp.add_parser(
+        "teardown_buckets",
+        help="Empty and delete many S3 Buckets concurrently.",
+    )
+    sp_teardown_buckets.add_argument(
+        "names", help="Bucket names: None (default)", nargs="*", default=None
+    )
+    sp_teardown_buckets.add_argument(
+        "--prefix", help="Also select buckets starting with this prefix",
+        default=None
+    )
+    sp_teardown_buckets.add_argument(
+        "--dry-run", help="Only print the buckets to be deleted",
+        action="store_true"
+    )
+    sp_teardown_buckets.add_argument(
+        "--workers", help="Buckets torn down at once: 8 (default)",
+        type=int, default=8
+    )
+    sp_teardown_buckets.set_defaults(func=teardown_buckets)
+
     # Execute subcommand function
     args_ = parser.parse_args()
     main(args_)
@@ -1,6 +1,24 @@
+import atexit
+import json
 import logging
+import queue
+import random
 import sys
-import boto3
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+
+from botocore.exceptions import ClientError
+
+from client_manager import get_client
 
 
 # Configure logging
@@ -10,51 +28,254 @@ logging.basicConfig(
 )
 log = logging.getLogger()
 
+PUBLISH_BATCH_BYTES = 256 * 1024
+THROTTLE_ERRORS = (
+    "Throttled",
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+)
+
 
 # Create SNS Topic
-def create_sns_topic(topic_name):
-    sns = boto3.client("sns")
+def create_sns_topic(topic_name, client=None):
+    sns = client or get_client("sns")
     sns.create_topic(Name=topic_name)
+    invalidate_sns_index(topics=True)
     log.info(f"SNS topic created: {topic_name}")
     return True
 
 
 # List all SNS Topics
-def list_sns_topics(next_token=None):
-    sns = boto3.client("sns")
+def list_sns_topics(next_token=None, client=None):
+    sns = client or get_client("sns")
     params = {"NextToken": next_token} if next_token else {}
     topics = sns.list_topics(**params)
-    log.info(f" {topics} \n -----Listed all SNS topics-----")
+    log.info(f"Listed {len(topics.get('Topics', []))} SNS topics")
     return topics.get("Topics", []), topics.get("NextToken", None)
 
 
 # List all SNS subscriptions
-def list_sns_subscriptions(next_token=None):
-    sns = boto3.client("sns")
+def list_sns_subscriptions(next_token=None, client=None):
+    sns = client or get_client("sns")
     params = {"NextToken": next_token} if next_token else {}
     subscriptions = sns.list_subscriptions(**params)
-    log.info(subscriptions)
+    log.info(f"Listed {len(subscriptions.get('Subscriptions', []))} subscriptions")
     print(subscriptions.get("Subscriptions", []))
-    return (subscriptions.get("Subscriptions", []),)
+    return (
+        subscriptions.get("Subscriptions", []),
+        subscriptions.get("NextToken", None),
+    )
+
+
+# Iterate over every SNS topic, following NextToken
+def iter_sns_topics(client=None):
+    sns = client or get_client("sns")
+    for page in sns.get_paginator("list_topics").paginate():
+        yield from page.get("Topics", [])
+
+
+# Iterate over every SNS subscription (of one topic, if given)
+def iter_sns_subscriptions(topic_arn=None, client=None):
+    sns = client or get_client("sns")
+    if topic_arn:
+        pages = sns.get_paginator("list_subscriptions_by_topic").paginate(
+            TopicArn=topic_arn
+        )
+    else:
+        pages = sns.get_paginator("list_subscriptions").paginate()
+    for page in pages:
+        yield from page.get("Subscriptions", [])
+
+
+# Local index of topic name -> ARN and topic ARN -> subscriptions,
+# refreshed from a full listing once INDEX_TTL seconds have passed.
+# Topic names are indexed per client, as the same name resolves to
+# another ARN in another region or account.
+INDEX_TTL = 300
+_index_lock = threading.Lock()
+_topic_index = weakref.WeakKeyDictionary()
+_subscription_index = {}
+
+
+# Drop the cached topic names, and the subscriptions of a topic (or all)
+def invalidate_sns_index(topic_arn=None, topics=False):
+    with _index_lock:
+        if topics:
+            _topic_index.clear()
+        if topic_arn:
+            _subscription_index.pop(topic_arn, None)
+        elif not topics:
+            _subscription_index.clear()
+
+
+# Resolve a topic name (or ARN) to its ARN through the local index.
+# Unknown names raise ValueError; while the index is fresh they do so
+# without listing the topics again.
+def resolve_topic_arn(topic, client=None):
+    if topic.startswith("arn:"):
+        return topic
+    sns = client or get_client("sns")
+    with _index_lock:
+        expires, arns = _topic_index.get(sns, (0, None))
+    if expires < time.monotonic():
+        arns = {
+            t["TopicArn"].rsplit(":", 1)[-1]: t["TopicArn"]
+            for t in iter_sns_topics(sns)
+        }
+        with _index_lock:
+            _topic_index[sns] = (time.monotonic() + INDEX_TTL, arns)
+    if topic not in arns:
+        raise ValueError(f"SNS topic {topic} does not exist")
+    return arns[topic]
+
+
+# Get the subscriptions of a topic through the local index
+def get_topic_subscriptions(topic, refresh=False, client=None):
+    topic_arn = resolve_topic_arn(topic, client)
+    with _index_lock:
+        entry = _subscription_index.get(topic_arn)
+    if refresh or not entry or entry[0] < time.monotonic():
+        subscriptions = list(iter_sns_subscriptions(topic_arn, client))
+        entry = (time.monotonic() + INDEX_TTL, subscriptions)
+        with _index_lock:
+            _subscription_index[topic_arn] = entry
+    return entry[1]
 
 
 # Subscribe to an SNS Topic
-def subscribe_sns_topic(topic_arn, mobile_number):
-    sns = boto3.client("sns")
+def subscribe_sns_topic(topic_arn, mobile_number, client=None):
+    sns = client or get_client("sns")
+    topic_arn = resolve_topic_arn(topic_arn, sns)
     params = {
         "TopicArn": topic_arn,
         "Protocol": "sms",
         "Endpoint": mobile_number,
     }
     res = sns.subscribe(**params)
+    invalidate_sns_index(topic_arn)
     print(res)
     log.info(f"Mobile number {mobile_number} now subscribed to {topic_arn}")
     return True
 
 
+# Backoff shared by a pool of workers: every throttle doubles the pause
+# taken before each call, every success halves it again
+class AdaptiveBackoff:
+    def __init__(self, initial=0.05, maximum=10):
+        self.initial = initial
+        self.maximum = maximum
+        self.delay = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if self.delay:
+            time.sleep(random.uniform(self.delay / 2, self.delay))
+
+    def success(self):
+        with self.lock:
+            self.delay = self.delay / 2 if self.delay > self.initial else 0
+
+    def throttled(self):
+        with self.lock:
+            self.delay = min(self.maximum, max(self.delay * 2, self.initial))
+
+
+# Call an SNS API, retrying throttled calls under a shared backoff
+def _call_with_backoff(func, backoff, max_retries=8, **params):
+    for attempt in range(max_retries + 1):
+        backoff.wait()
+        try:
+            res = func(**params)
+        except ClientError as err:
+            code = err.response.get("Error", {}).get("Code")
+            if code not in THROTTLE_ERRORS or attempt == max_retries:
+                raise
+            backoff.throttled()
+            continue
+        backoff.success()
+        return res
+
+
+# Run one call per argument over a thread pool; returns (done, failed)
+def _run_bulk(func, args, workers):
+    done = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(func, arg): arg for arg in args}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                done += 1
+            except ClientError as err:
+                log.error(f"{futures[future]}: {err}")
+                failed += 1
+    return done, failed
+
+
+# Read non-empty, stripped lines from a file (endpoints, ARNs, ...)
+def read_lines(file_path):
+    with open(file_path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+# Subscribe many endpoints to an SNS Topic, skipping existing subscribers
+def subscribe_sns_topics(
+    topic, endpoints, protocol="sms", workers=8, client=None
+):
+    sns = client or get_client("sns")
+    topic_arn = resolve_topic_arn(topic, sns)
+    existing = {
+        sub["Endpoint"]
+        for sub in get_topic_subscriptions(topic_arn, client=sns)
+        if sub["Protocol"] == protocol
+    }
+    endpoints = list(dict.fromkeys(endpoints))
+    todo = [endpoint for endpoint in endpoints if endpoint not in existing]
+    backoff = AdaptiveBackoff()
+    done, failed = _run_bulk(
+        lambda endpoint: _call_with_backoff(
+            sns.subscribe,
+            backoff,
+            TopicArn=topic_arn,
+            Protocol=protocol,
+            Endpoint=endpoint,
+        ),
+        todo,
+        workers,
+    )
+    invalidate_sns_index(topic_arn)
+    log.info(
+        f"{topic_arn}: {done} subscribed, {len(endpoints) - len(todo)} "
+        f"already subscribed, {failed} failed"
+    )
+    return done, failed
+
+
+# Unsubscribe many subscriptions
+def unsubscribe_sns_topics(subscription_arns, workers=8, client=None):
+    sns = client or get_client("sns")
+    subscription_arns = list(subscription_arns)
+    backoff = AdaptiveBackoff()
+    done, failed = _run_bulk(
+        lambda arn: _call_with_backoff(
+            sns.unsubscribe, backoff, SubscriptionArn=arn
+        ),
+        subscription_arns,
+        workers,
+    )
+    for arn in subscription_arns:
+        invalidate_sns_index(arn.rsplit(":", 1)[0])
+    log.info(f"{done} unsubscribed, {failed} failed")
+    return done, failed
+
+
 # Send an SNS Message
-def send_sns_message(topic_arn, message):
-    sns = boto3.client("sns")
+def send_sns_message(topic_arn, message, client=None):
+    sns = client or get_client("sns")
+    topic_arn = resolve_topic_arn(topic_arn, sns)
     params = {
         "TopicArn": topic_arn,
         "Message": message,
@@ -65,22 +286,295 @@ def send_sns_message(topic_arn, message):
     return True
 
 
+# In-process notification dispatcher. submit() queues a message and
+# returns a Future (resolved with the MessageId) instead of blocking on
+# the network; worker threads drain the queue into PublishBatch calls.
+# - Back-pressure: when max_queue messages are waiting, submit() blocks
+#   (up to timeout) and then raises queue.Full.
+# - Identical messages to the same topic within dedupe_window seconds
+#   share the first message's Future and are published once.
+# - shutdown() (or leaving a with block) flushes everything queued.
+class NotificationDispatcher:
+    def __init__(
+        self,
+        workers=4,
+        max_queue=10000,
+        batch_wait=0.05,
+        dedupe_window=60,
+        timeout=None,
+        client=None,
+    ):
+        self.sns = client or get_client("sns")
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_wait = batch_wait
+        self.dedupe_window = dedupe_window
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.recent = OrderedDict()
+        self.latencies = deque(maxlen=1000)
+        self.counts = {"published": 0, "failed": 0, "deduplicated": 0}
+        self.closed = False
+        self.threads = [
+            threading.Thread(target=self._worker, daemon=True)
+            for _ in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def submit(self, topic, message, **entry):
+        if self.closed:
+            raise RuntimeError("Dispatcher is shut down")
+        topic_arn = resolve_topic_arn(topic, self.sns)
+        attrs = json.dumps(entry, sort_keys=True, default=str)
+        key = (topic_arn, message, attrs)
+        now = time.monotonic()
+        with self.lock:
+            while self.recent and next(iter(self.recent.values()))[0] < now:
+                self.recent.popitem(last=False)
+            if key in self.recent:
+                self.counts["deduplicated"] += 1
+                return self.recent[key][1]
+            future = Future()
+            self.recent[key] = (now + self.dedupe_window, future)
+        entry["Message"] = message
+        try:
+            self.queue.put((topic_arn, entry, future), timeout=self.timeout)
+        except queue.Full:
+            # Never queued: don't hand this Future to later duplicates
+            with self.lock:
+                if self.recent.get(key, (None, None))[1] is future:
+                    del self.recent[key]
+            raise
+        return future
+
+    def _worker(self):
+        stop = False
+        while not stop:
+            item = self.queue.get()
+            if item is None:
+                return
+            # Collect up to 10 messages arriving within batch_wait
+            items = [item]
+            deadline = time.monotonic() + self.batch_wait
+            while len(items) < 10:
+                try:
+                    item = self.queue.get(
+                        timeout=max(0, deadline - time.monotonic())
+                    )
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                items.append(item)
+            batches = {}
+            for item in items:
+                batches.setdefault(item[0], []).append(item)
+            for topic_arn, batch in batches.items():
+                try:
+                    self._publish(topic_arn, batch)
+                except Exception as err:
+                    self._fail([i for i in batch if not i[2].done()], err)
+
+    def _publish(self, topic_arn, items, max_retries=3):
+        pending = {str(i): item for i, item in enumerate(items)}
+        for attempt in range(max_retries + 1):
+            if attempt:
+                time.sleep(random.uniform(0, min(5, 0.1 * 2**attempt)))
+            entries = [
+                dict(entry, Id=i) for i, (_, entry, _) in pending.items()
+            ]
+            started = time.monotonic()
+            try:
+                res = self.sns.publish_batch(
+                    TopicArn=topic_arn, PublishBatchRequestEntries=entries
+                )
+            except ClientError as err:
+                code = err.response.get("Error", {}).get("Code")
+                if code in THROTTLE_ERRORS and attempt < max_retries:
+                    continue
+                self._fail(pending.values(), err)
+                return
+            self.latencies.append(time.monotonic() - started)
+            for ok in res.get("Successful", []):
+                pending.pop(ok["Id"])[2].set_result(ok["MessageId"])
+                with self.lock:
+                    self.counts["published"] += 1
+            retry = {}
+            for failed in res.get("Failed", []):
+                item = pending.pop(failed["Id"])
+                if failed.get("SenderFault") or attempt == max_retries:
+                    self._fail([item], RuntimeError(
+                        f"{failed.get('Code')}: {failed.get('Message')}"
+                    ))
+                else:
+                    retry[failed["Id"]] = item
+            pending = retry
+            if not pending:
+                return
+
+    def _fail(self, items, err):
+        for _, _, future in items:
+            future.set_exception(err)
+            with self.lock:
+                self.counts["failed"] += 1
+
+    def metrics(self):
+        latencies = sorted(self.latencies)
+        with self.lock:
+            metrics = dict(self.counts, queue_depth=self.queue.qsize())
+        if latencies:
+            metrics["publish_latency"] = {
+                "avg": sum(latencies) / len(latencies),
+                "p50": latencies[len(latencies) // 2],
+                "p95": latencies[int(len(latencies) * 0.95)],
+                "max": latencies[-1],
+            }
+        return metrics
+
+    def shutdown(self, wait=True):
+        if self.closed:
+            return
+        self.closed = True
+        # Workers drain everything queued before reaching their sentinel
+        for _ in self.threads:
+            self.queue.put(None)
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+# Send an SNS Message without waiting for it (returns a Future)
+def send_sns_message_async(topic_arn, message, **entry):
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = NotificationDispatcher()
+            atexit.register(_dispatcher.shutdown)
+    return _dispatcher.submit(topic_arn, message, **entry)
+
+
+# Read messages from a file: one message per line, or one JSON
+# PublishBatch entry per line for .ndjson/.jsonl files
+def read_sns_messages(file_path):
+    entries = str(file_path).endswith((".ndjson", ".jsonl"))
+    with open(file_path) as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line:
+                yield json.loads(line) if entries else line
+
+
+# Group messages into PublishBatch requests (10 entries, 256 KB max)
+def _iter_publish_batches(messages):
+    batch, size = [], 0
+    for message in messages:
+        entry = dict(message) if isinstance(message, dict) else {
+            "Message": message
+        }
+        entry_size = len(entry["Message"].encode())
+        if batch and (len(batch) == 10 or size + entry_size > PUBLISH_BATCH_BYTES):
+            yield batch
+            batch, size = [], 0
+        entry["Id"] = str(len(batch))
+        batch.append(entry)
+        size += entry_size
+    if batch:
+        yield batch
+
+
+# Publish one batch, retrying only the entries that failed on AWS' side
+def _publish_batch(sns, topic_arn, entries, max_retries=5):
+    for attempt in range(max_retries + 1):
+        if attempt:
+            time.sleep(random.uniform(0, min(10, 0.1 * 2**attempt)))
+        try:
+            res = sns.publish_batch(
+                TopicArn=topic_arn, PublishBatchRequestEntries=entries
+            )
+        except ClientError as err:
+            code = err.response.get("Error", {}).get("Code")
+            if code not in THROTTLE_ERRORS:
+                raise
+            continue
+        failed = {f["Id"]: f for f in res.get("Failed", [])}
+        retry = {i for i, f in failed.items() if not f.get("SenderFault")}
+        for f in failed.values():
+            if f.get("SenderFault"):
+                log.error(f"Message rejected: {f.get('Code')} {f.get('Message')}")
+        entries = [entry for entry in entries if entry["Id"] in retry]
+        if not entries:
+            break
+    return len(entries)
+
+
+# Publish many SNS messages with PublishBatch over a thread pool
+def publish_sns_messages(topic_arn, messages, workers=8, client=None):
+    sns = client or get_client("sns")
+    topic_arn = resolve_topic_arn(topic_arn, sns)
+    sent = failed = 0
+    started = time.monotonic()
+
+    def report(batch, future):
+        nonlocal sent, failed
+        try:
+            lost = future.result()
+        except ClientError as err:
+            log.error(f"Batch failed: {err}")
+            lost = len(batch)
+        sent += len(batch) - lost
+        failed += lost
+
+    pending = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch in _iter_publish_batches(messages):
+            # Keep at most 2 batches per worker in flight
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report(pending.pop(future), future)
+            future = pool.submit(_publish_batch, sns, topic_arn, batch)
+            pending[future] = batch
+        for future in as_completed(pending):
+            report(pending[future], future)
+
+    elapsed = time.monotonic() - started
+    log.info(
+        f"Published {sent} messages to {topic_arn} in {elapsed:.2f}s "
+        f"({sent / (elapsed or 1e-9):.0f} messages/s), {failed} failed"
+    )
+    return sent, failed
+
+
 # Unsubscribe to an SNS Topic
-def unsubscribe_sns_topic(subscription_arn):
-    sns = boto3.client("sns")
+def unsubscribe_sns_topic(subscription_arn, client=None):
+    sns = client or get_client("sns")
     params = {
         "SubscriptionArn": subscription_arn,
     }
     res = sns.unsubscribe(**params)
+    invalidate_sns_index(subscription_arn.rsplit(":", 1)[0])
     print(res)
     log.info(f"Unsubscribed: {subscription_arn}")
     return True
 
 
 # Delete an SNS Topic(This will delete the topic and all it's subscriptions.)
-def delete_sns_topic(topic_arn):
-    sns = boto3.client("sns")
+def delete_sns_topic(topic_arn, client=None):
+    sns = client or get_client("sns")
+    topic_arn = resolve_topic_arn(topic_arn, sns)
     sns.delete_topic(TopicArn=topic_arn)
+    invalidate_sns_index(topic_arn, topics=True)
     log.info(f"SNS Topic deleted: {topic_arn}")
     return True
 
@@ -93,10 +587,28 @@ def main(args_):
             args_.func(args_.next_token)
         elif args_.func.__name__ == "list_sns_subscriptions":
             args_.func(args_.next_token)
+        elif args_.func.__name__ == "iter_sns_topics":
+            for topic in args_.func():
+                print(topic["TopicArn"])
+        elif args_.func.__name__ == "get_topic_subscriptions":
+            for sub in args_.func(args_.topic):
+                print(sub["SubscriptionArn"], sub["Protocol"], sub["Endpoint"])
         elif args_.func.__name__ == "subscribe_sns_topic":
             args_.func(args_.topic_arn, args_.mobile_number)
+        elif args_.func.__name__ == "subscribe_sns_topics":
+            args_.func(
+                args_.topic_arn, read_lines(args_.file_path),
+                args_.protocol, args_.workers,
+            )
+        elif args_.func.__name__ == "unsubscribe_sns_topics":
+            args_.func(read_lines(args_.file_path), args_.workers)
         elif args_.func.__name__ == "send_sns_message":
             args_.func(args_.topic_arn, args_.message)
+        elif args_.func.__name__ == "publish_sns_messages":
+            args_.func(
+                args_.topic_arn, read_sns_messages(args_.file_path),
+                args_.workers,
+            )
         elif args_.func.__name__ == "unsubscribe_sns_topic":
             args_.func(args_.subscription_arn)
         elif args_.func.__name__ == "delete_sns_topic":
@@ -150,6 +662,24 @@ if __name__ == "__main__":
     )
     sp_list_subs.set_defaults(func=list_sns_subscriptions)
 
+    # _______________List every topic subcommand_______________
+    sp_all_topics = sp.add_parser(
+        "list_all_sns_topics",
+        help="List every SNS topic (all pages)",
+    )
+    sp_all_topics.set_defaults(func=iter_sns_topics)
+
+    # _______________List topic subscriptions subcommand_______________
+    sp_topic_subs = sp.add_parser(
+        "list_topic_subscriptions",
+        help="List every subscription of a topic (all pages)",
+    )
+    sp_topic_subs.add_argument(
+        "topic",
+        help="SNS Topic name or ARN",
+    )
+    sp_topic_subs.set_defaults(func=get_topic_subscriptions)
+
     # _______________Subscribe topic subcommand_______________
     sp_subscribe_topic = sp.add_parser(
         "subscribe_sns_topic",
@@ -157,7 +687,7 @@ if __name__ == "__main__":
     )
     sp_subscribe_topic.add_argument(
         "topic_arn",
-        help="SNS Topic ARN",
+        help="SNS Topic name or ARN",
     )
     sp_subscribe_topic.add_argument(
         "mobile_number",
@@ -165,6 +695,32 @@ if __name__ == "__main__":
     )
     sp_subscribe_topic.set_defaults(func=subscribe_sns_topic)
 
+    # _______________Bulk subscribe subcommand_______________
+    sp_subscribe_topics = sp.add_parser(
+        "subscribe_sns_topics",
+        help="Subscribe every endpoint listed in a file to an SNS Topic",
+    )
+    sp_subscribe_topics.add_argument(
+        "topic_arn",
+        help="SNS Topic name or ARN",
+    )
+    sp_subscribe_topics.add_argument(
+        "file_path",
+        help="File with one endpoint per line",
+    )
+    sp_subscribe_topics.add_argument(
+        "--protocol",
+        help="Subscription protocol: sms (default)",
+        default="sms",
+    )
+    sp_subscribe_topics.add_argument(
+        "--workers",
+        help="Calls made at once: 8 (default)",
+        type=int,
+        default=8,
+    )
+    sp_subscribe_topics.set_defaults(func=subscribe_sns_topics)
+
     # _______________Publish message to a topic subcommand________________
     sp_send_message = sp.add_parser(
         "send_sns_message",
@@ -172,7 +728,7 @@ if __name__ == "__main__":
     )
     sp_send_message.add_argument(
         "topic_arn",
-        help="SNS Topic ARN",
+        help="SNS Topic name or ARN",
     )
     sp_send_message.add_argument(
         "message",
@@ -180,6 +736,27 @@ if __name__ == "__main__":
     )
     sp_send_message.set_defaults(func=send_sns_message)
 
+    # _______________Publish messages in bulk subcommand________________
+    sp_publish_messages = sp.add_parser(
+        "publish_sns_messages",
+        help="Publish messages from a file in batches",
+    )
+    sp_publish_messages.add_argument(
+        "topic_arn",
+        help="SNS Topic name or ARN",
+    )
+    sp_publish_messages.add_argument(
+        "file_path",
+        help="One message per line (JSON entries for .ndjson/.jsonl)",
+    )
+    sp_publish_messages.add_argument(
+        "--workers",
+        help="Batches sent at once: 8 (default)",
+        type=int,
+        default=8,
+    )
+    sp_publish_messages.set_defaults(func=publish_sns_messages)
+
     # _______________Unsubscribe to a topic subcommand______________
     sp_unsubscribe = sp.add_parser(
         "unsubscribe_sns_topic",
@@ -191,6 +768,23 @@ if __name__ == "__main__":
     )
     sp_unsubscribe.set_defaults(func=unsubscribe_sns_topic)
 
+    # _______________Bulk unsubscribe subcommand______________
+    sp_unsubscribe_many = sp.add_parser(
+        "unsubscribe_sns_topics",
+        help="Unsubscribe every subscription ARN listed in a file",
+    )
+    sp_unsubscribe_many.add_argument(
+        "file_path",
+        help="File with one subscription ARN per line",
+    )
+    sp_unsubscribe_many.add_argument(
+        "--workers",
+        help="Calls made at once: 8 (default)",
+        type=int,
+        default=8,
+    )
+    sp_unsubscribe_many.set_defaults(func=unsubscribe_sns_topics)
+
     # _______________Delete a topic_______________
     sp_delete_topic = sp.add_parser(
         "delete_sns_topic",
@@ -198,7 +792,7 @@ if __name__ == "__main__":
     )
     sp_delete_topic.add_argument(
         "topic_arn",
-        help="SNS Topic ARN",
+        help="SNS Topic name or ARN",
     )
     sp_delete_topic.set_defaults(func=delete_sns_topic)
 
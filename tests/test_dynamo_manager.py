@@ -0,0 +1,163 @@
+from collections import Counter
+
+import pytest
+from botocore.exceptions import ClientError
+
+import dynamo_manager
+
+
+class StubTable:
+    def __init__(self, conflict=False):
+        self.calls = Counter()
+        self.conflict = conflict
+
+    def _check(self, op, params):
+        if self.conflict and 'ConditionExpression' in params:
+            raise ClientError(
+                {'Error': {'Code': 'ConditionalCheckFailedException'}}, op)
+
+    def put_item(self, **params):
+        self.calls['put_item'] += 1
+        self._check('PutItem', params)
+        return {}
+
+    def update_item(self, **params):
+        self.calls['update_item'] += 1
+        self._check('UpdateItem', params)
+        names = params['ExpressionAttributeNames']
+        values = params.get('ExpressionAttributeValues', {})
+        item = dict(params['Key'])
+        for placeholder, name in names.items():
+            item[name] = values.get(f':{placeholder[1:]}')
+        return {'Attributes': item}
+
+    def get_item(self, **params):
+        self.calls['get_item'] += 1
+        return {}
+
+
+class StubResource:
+    def __init__(self, table):
+        self.table = table
+
+    def Table(self, name):
+        return self.table
+
+
+@pytest.fixture
+def table():
+    return StubTable()
+
+
+def test_create_product_writes_once_without_reading(table):
+    item = dynamo_manager.create_product(
+        'books', 'sku-1', resource=StubResource(table), price=10)
+    assert item == {'category': 'books', 'sku': 'sku-1', 'price': 10}
+    assert table.calls == Counter(put_item=1)
+
+
+def test_create_product_without_overwrite_is_one_conditional_put(table):
+    dynamo_manager.create_product(
+        'books', 'sku-1', resource=StubResource(table), overwrite=False)
+    assert table.calls == Counter(put_item=1)
+
+
+def test_update_product_returns_attributes_without_reading(table):
+    item = dynamo_manager.update_product(
+        'books', 'sku-1', resource=StubResource(table), price=12)
+    assert item['price'] == 12
+    assert table.calls == Counter(update_item=1)
+
+
+def test_update_product_version_conflict():
+    table = StubTable(conflict=True)
+    item = dynamo_manager.update_product(
+        'books', 'sku-1', resource=StubResource(table),
+        expected_version=3, price=12)
+    assert item is None
+    assert table.calls == Counter(update_item=1)
+
+
+def test_update_product_bumps_version(table):
+    item = dynamo_manager.update_product(
+        'books', 'sku-1', resource=StubResource(table),
+        expected_version=3, price=12)
+    assert item['version'] == 4
+    assert table.calls == Counter(update_item=1)
+
+
+def test_merge_updates_never_names_an_attribute_twice():
+    merged = dynamo_manager._merge_updates([
+        ('books', 'sku-1', {'set': {'stock': 10}}),
+        ('books', 'sku-1', {'add': {'stock': 5}}),
+        ('books', 'sku-2', {'remove': ['stock']}),
+        ('books', 'sku-2', {'add': {'stock': 3}}),
+        ('books', 'sku-3', {'add': {'stock': 1}}),
+        ('books', 'sku-3', {'add': {'stock': 2}, 'remove': ['price']}),
+    ])
+    assert merged == [
+        ('books', 'sku-1', {'set': {'stock': 15}}),
+        ('books', 'sku-2', {'set': {'stock': 3}}),
+        ('books', 'sku-3', {'add': {'stock': 3}, 'remove': ['price']}),
+    ]
+
+
+class StubClient:
+    def __init__(self):
+        self.updates = []
+
+    def update_item(self, **params):
+        self.updates.append(params)
+        return {}
+
+
+class StubClientResource:
+    def __init__(self):
+        self.meta = type('Meta', (), {'client': StubClient()})()
+
+
+def test_update_products_merges_per_item_and_uses_the_resource():
+    resource = StubClientResource()
+    updated = dynamo_manager.update_products([
+        ('books', 'sku-1', {'set': {'price': 10}}),
+        ('books', 'sku-2', {'set': {'price': 7}}),
+        ('books', 'sku-1', {'set': {'price': 12}}),
+    ], resource=resource)
+    updates = resource.meta.client.updates
+    assert updated == 2
+    assert len(updates) == 2
+    sku_1 = next(u for u in updates if u['Key']['sku'] == 'sku-1')
+    assert sku_1['ExpressionAttributeValues'] == {':s0': 12}
+
+
+def test_export_keeps_exact_numbers(tmp_path):
+    from decimal import Decimal
+    path = tmp_path / 'segment.ndjson'
+    dynamo_manager._write_ndjson(path, iter([
+        {'sku': 'a', 'price': Decimal('12345678901234567890.12')},
+        {'sku': 'b', 'price': Decimal('10')},
+    ]), compress=False)
+    assert path.read_text().splitlines() == [
+        '{"sku":"a","price":12345678901234567890.12}',
+        '{"sku":"b","price":10}',
+    ]
+
+
+def test_parquet_export_widens_numeric_columns(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    from decimal import Decimal
+    path = tmp_path / 'segment.parquet'
+    count = dynamo_manager._write_parquet(path, iter([
+        {'sku': 'a', 'price': Decimal('10')},
+        {'sku': 'b', 'price': Decimal('9.99'), 'stock': Decimal('3')},
+    ]), compress=False, row_group_size=1)
+    rows = pq.read_table(path).to_pylist()
+    assert count == 2
+    assert [row['price'] for row in rows] == [Decimal('10'), Decimal('9.99')]
+    assert rows[1]['stock'] == 3
+
+
+def test_token_bucket_acquires_below_one_unit_per_second():
+    bucket = dynamo_manager.TokenBucket(0.5)
+    assert bucket.capacity == 1
+    bucket.acquire()
@@ -0,0 +1,113 @@
+import pytest
+from botocore.exceptions import ClientError
+
+import sns_manager
+
+
+def throttled(operation):
+    return ClientError(
+        {"Error": {"Code": "Throttled", "Message": "Rate exceeded"}}, operation
+    )
+
+
+class ThrottlingSNS:
+    def __init__(self, throttles):
+        self.throttles = throttles
+        self.calls = 0
+
+    def subscribe(self, **params):
+        self.calls += 1
+        if self.calls <= self.throttles:
+            raise throttled("Subscribe")
+        return {"SubscriptionArn": f"{params['TopicArn']}:sub"}
+
+
+def test_call_with_backoff_retries_throttled_calls():
+    sns = ThrottlingSNS(throttles=3)
+    backoff = sns_manager.AdaptiveBackoff(initial=0.001, maximum=0.01)
+    res = sns_manager._call_with_backoff(
+        sns.subscribe, backoff, TopicArn="arn:aws:sns:eu-west-1:1:t"
+    )
+    assert res["SubscriptionArn"] == "arn:aws:sns:eu-west-1:1:t:sub"
+    assert sns.calls == 4
+
+
+def test_call_with_backoff_engages_and_relaxes():
+    backoff = sns_manager.AdaptiveBackoff(initial=0.001, maximum=0.01)
+    sns = ThrottlingSNS(throttles=2)
+    delays = []
+    subscribe = sns.subscribe
+
+    def recording(**params):
+        delays.append(backoff.delay)
+        return subscribe(**params)
+
+    sns_manager._call_with_backoff(recording, backoff, TopicArn="arn:t")
+    assert delays == [0, 0.001, 0.002]
+    assert backoff.delay == 0.001
+
+
+def test_call_with_backoff_gives_up_after_max_retries():
+    sns = ThrottlingSNS(throttles=10)
+    backoff = sns_manager.AdaptiveBackoff(initial=0.001, maximum=0.01)
+    with pytest.raises(ClientError):
+        sns_manager._call_with_backoff(
+            sns.subscribe, backoff, max_retries=2, TopicArn="arn:t"
+        )
+    assert sns.calls == 3
+
+
+def test_call_with_backoff_raises_other_errors_at_once():
+    def subscribe(**params):
+        raise ClientError({"Error": {"Code": "NotFound"}}, "Subscribe")
+
+    backoff = sns_manager.AdaptiveBackoff(initial=0.001)
+    with pytest.raises(ClientError):
+        sns_manager._call_with_backoff(subscribe, backoff, TopicArn="arn:t")
+    assert backoff.delay == 0
+
+
+class ListingSNS:
+    def __init__(self, names, region="eu-west-1"):
+        self.names = names
+        self.region = region
+        self.listings = 0
+
+    def get_paginator(self, operation):
+        sns = self
+
+        class Paginator:
+            def paginate(self):
+                sns.listings += 1
+                yield {
+                    "Topics": [
+                        {"TopicArn": f"arn:aws:sns:{sns.region}:1:{name}"}
+                        for name in sns.names
+                    ]
+                }
+
+        return Paginator()
+
+
+def test_resolve_topic_arn_caches_unknown_names():
+    sns_manager.invalidate_sns_index(topics=True)
+    sns = ListingSNS(["alerts"])
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            sns_manager.resolve_topic_arn("missing", sns)
+    assert sns_manager.resolve_topic_arn("alerts", sns).endswith(":alerts")
+    assert sns.listings == 1
+
+
+def test_resolve_topic_arn_indexes_names_per_client():
+    sns_manager.invalidate_sns_index(topics=True)
+    east = ListingSNS(["alerts"], region="us-east-1")
+    west = ListingSNS(["alerts"], region="eu-west-1")
+    for _ in range(2):
+        assert sns_manager.resolve_topic_arn("alerts", east).startswith(
+            "arn:aws:sns:us-east-1:"
+        )
+        assert sns_manager.resolve_topic_arn("alerts", west).startswith(
+            "arn:aws:sns:eu-west-1:"
+        )
+    assert east.listings == west.listings == 1